@@ -0,0 +1,166 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from deleter import DirectoryPruner, batched
+from monitor import Target, period_rule, target_filter
+from scanner import list_directory
+from scheduler import drive_key
+
+# asyncio driver for MonitoringCore. Every target is a task; a period target in files mode is a
+# scan -> filter -> delete pipeline joined by bounded queues, so scanning one target overlaps deleting
+# another and a slow delete stage holds its scanner back. Blocking filesystem calls run in the scan
+# and delete executors, which callers may replace. Size and whole-folder rules need the full scan
+# before choosing, so they run as one blocking call on the delete executor.
+# Used by MonitoringCore.run() with async_engine=True, i.e. from the Qt thread and the CLI alike.
+
+QUEUE_SIZE = 8
+END = None  # Sentinel closing a stage's queue
+
+
+class AsyncEngine:
+    def __init__(self, core, queue_size=QUEUE_SIZE, scan_executor=None, delete_executor=None):
+        self.core = core
+        self.queue_size = queue_size
+        self.scan_executor = scan_executor or ThreadPoolExecutor(max(1, core.max_workers),
+                                                                 thread_name_prefix="scan")
+        self.delete_executor = delete_executor or ThreadPoolExecutor(max(1, core.max_workers),
+                                                                     thread_name_prefix="delete")
+        self.drive_semaphores = {}
+
+    async def blocking(self, executor, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+    async def run(self):
+        try:
+            while self.core.monitoring:
+                await self.run_cycle()
+                # The interval waits on the stop event and the watcher, both blocking
+                await self.blocking(None, self.core.enter_interval_and_update_status)
+        finally:
+            self.close()
+
+    async def run_once(self):
+        try:
+            await self.run_cycle()
+        finally:
+            self.close()
+
+    async def run_cycle(self):
+        cycle_start = self.core.start_cycle()
+        await asyncio.gather(*(self.run_target(target) for target in self.core.cycle_targets()))
+        self.core.finish_cycle(cycle_start)
+
+    def drive_semaphore(self, target):
+        # Same per-drive concurrency limits as DriveScheduler
+        drive = drive_key(target[0], target[1])
+        semaphore = self.drive_semaphores.get(drive)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.core.drive_scheduler.drive_limit(drive))
+            self.drive_semaphores[drive] = semaphore
+        return semaphore
+
+    async def run_target(self, target):
+        async with self.drive_semaphore(target):
+            start_time = time.time()
+            error = None
+            try:
+                await self.process_target(target)
+            except Exception as e:
+                error = e
+            self.core.report_target_done(target, time.time() - start_time, error)
+
+    async def process_target(self, target):
+        core = self.core
+        hdd_path, directory_to_clean, target_space_gb, target_period_days, age_mode = Target(*target)[:5]
+        file_filter = target_filter(target)
+        shared = Target(*target).shared
+        if not core.monitoring:
+            return
+        core.status_signal.emit(f"Checking target: {directory_to_clean}")
+
+        if target_period_days is not None:
+            # The index and the process pipeline have their own scans, a single file needs none, and a
+            # shared target is split by leases in delete_files_by_period
+            pipelined = core.file_index is None and core.scan_pipeline is None and not shared
+            if age_mode == "files" and pipelined and os.path.isdir(directory_to_clean):
+                await self.delete_by_period(directory_to_clean, target_period_days, file_filter)
+            else:
+                await self.blocking(self.delete_executor, core.delete_files_by_period, directory_to_clean,
+                                    target_period_days, age_mode, file_filter, shared)
+
+        if target_space_gb is not None and hdd_path is not None:
+            await self.blocking(self.delete_executor, core.delete_files_by_size, hdd_path, target_space_gb,
+                                directory_to_clean, age_mode, file_filter, shared)
+
+    async def delete_by_period(self, directory, target_period_days, file_filter=None):
+        # Not resumable after a stop like the threaded walk; the next cycle scans again
+        core = self.core
+        core.log_signal.emit(f"Target Path: {directory}.")
+        core.log_signal.emit(f"Delete all the files older than {target_period_days} day(s).")
+        cutoff_mtime = time.time() - target_period_days * 24 * 60 * 60
+        rule = period_rule(target_period_days, file_filter=file_filter)
+        pruner = DirectoryPruner()
+        listings = asyncio.Queue(self.queue_size)
+        batches = asyncio.Queue(self.queue_size)
+
+        await self.run_stages(
+            self.scan_stage(directory, listings),
+            self.filter_stage(listings, batches, cutoff_mtime, file_filter, pruner),
+            self.delete_stage(batches, pruner, rule, directory),
+        )
+        await self.blocking(self.delete_executor, core.prune_empty_folders, pruner)
+
+    async def run_stages(self, *stages):
+        # A failing stage cancels the others, which could otherwise wait on a queue forever
+        tasks = [asyncio.ensure_future(stage) for stage in stages]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def scan_stage(self, directory, listings):
+        # Depth-first like walk_records, one executor call per folder
+        stack = [directory]
+        while stack and self.core.monitoring:
+            root = stack.pop()
+            try:
+                dir_records, file_records = await self.blocking(self.scan_executor, list_directory, root,
+                                                                self.core.report_scan_error)
+            except OSError as e:
+                self.core.report_scan_error(e)
+                continue
+            await listings.put((root, dir_records, file_records))
+            stack.extend(record.path for record in reversed(dir_records))
+        await listings.put(END)
+
+    async def filter_stage(self, listings, batches, cutoff_mtime, file_filter, pruner):
+        while True:
+            listing = await listings.get()
+            if listing is END:
+                break
+            root, dir_records, file_records = listing
+            pruner.add_listing(root, dir_records, file_records)
+            expired = [record for record in file_records if record.mtime <= cutoff_mtime]
+            if file_filter is not None:
+                expired = list(file_filter.select(expired))
+            for batch in batched(expired):
+                await batches.put(batch)
+        await batches.put(END)
+
+    async def delete_stage(self, batches, pruner, rule, directory):
+        while True:
+            batch = await batches.get()
+            if batch is END:
+                return
+            if self.core.monitoring:
+                await self.blocking(self.delete_executor, self.core.delete_files_batch, batch, pruner, rule,
+                                    directory)
+
+    def close(self):
+        self.scan_executor.shutdown(wait=False)
+        self.delete_executor.shutdown(wait=False)
@@ -1,21 +1,26 @@
 import os
-import shutil
 import sys
 import csv
 import psutil
-import time
 import atexit
 import traceback
-from threading import Lock
-from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from PyQt5.QtCore import QThread, pyqtSignal, QLockFile, Qt, QTimer
-from PyQt5.QtWidgets import QApplication, QCheckBox, QMainWindow, QLabel, QPushButton, QComboBox, QLineEdit, QFileDialog, QMessageBox, QTextEdit, QSystemTrayIcon, QMenu, QAction, QListWidget, QListWidgetItem
+from PyQt5.QtWidgets import QApplication, QCheckBox, QMainWindow, QLabel, QPushButton, QComboBox, QLineEdit, QFileDialog, QMessageBox, QTextEdit, QPlainTextEdit, QSystemTrayIcon, QMenu, QAction, QListWidget, QListWidgetItem
 from resources import *
 from PyQt5.QtGui import QIcon, QTextCursor, QFont
-
-# Define a global variable for slow_mode
-global_slow_mode = True
+import monitor
+from monitor import (INDEX_PATH, METRICS_PATH, RESUME_PATH, TARGET_CSV_PATH, MonitoringCore, Target, load_target_list,
+                     target_filter)
+from logbuffer import LogBatcher, LogRingBuffer
+from filelog import FileLogger
+from metrics import MonitorMetrics
+from scheduler import parse_drive_limits
+
+# Lines kept in the log view, and how often it is refreshed
+LOG_CAPACITY = 1000
+LOG_REFRESH_MS = 100
+LOG_FOLDER = "D:/Program/RVS/Autodelete/Log"
 
 class SingleInstanceApp(QApplication):
     def __init__(self, argv, main_window_class):
@@ -46,266 +51,22 @@ class SingleInstanceApp(QApplication):
                 widget.raise_()
                 break
 
-class MonitoringThread(QThread):
+class MonitoringThread(MonitoringCore, QThread):
+    # Qt front end for MonitoringCore; the deletion logic lives in monitor.py.
+    # log_signal stays a plain in-thread signal; its messages reach the UI in batches through log_batch_signal.
     status_signal = pyqtSignal(str)
-    log_signal = pyqtSignal(str)
     log_batch_signal = pyqtSignal(list)  # Define the log_batch_signal
     countdown_signal = pyqtSignal(str)
+    progress_signal = pyqtSignal(object)  # progress.ProgressSnapshot, at most every LOG_REFRESH_MS
+    targets_signal = pyqtSignal(list)  # Target list reloaded from targetlist.csv
 
-    def __init__(self, target_list, monitoring_interval, max_workers=8):
-        super().__init__()
-        self.deleted_file_count = 0
-        self.target_list = target_list
-        self.monitoring_interval = monitoring_interval
-        self.max_workers = max_workers if max_workers > 0 else 4  # Set a default value of 4 if max_workers is 0 or negative
-        self.monitoring = True
-        self.slow_mode = True
-        self.deleted_dirs = set()
-
-    def run(self):
-        if global_slow_mode:
-            self.log_signal.emit("Slow Mode: On")
-        else:
-            self.log_signal.emit("Slow Mode: Off")
-            
-        while self.monitoring:
-                
-            for target in self.target_list:
-                hdd_path, directory_to_clean, target_space_gb, target_period_days = target
-
-                print(f"Checking target: {directory_to_clean}")
-                self.status_signal.emit(f"Checking target: {directory_to_clean}")
-
-                if target_period_days is not None:
-                    print("period")
-                    self.delete_files_by_period(directory_to_clean, target_period_days)
-
-                if target_space_gb is not None and hdd_path is not None:
-                    print("size")
-                    self.delete_files_by_size(hdd_path, target_space_gb, directory_to_clean)
-
-            self.enter_interval_and_update_status()
-            print(f"End of run: {time.time()}")
-
-    
-    def delete_files_by_size(self, hdd_path, target_space_gb, directory_to_clean):
-        if self.monitoring == True:
-            hdd_space_remaining = self.get_hdd_space_remaining(hdd_path)
-            hdd_space_remaining_gb = hdd_space_remaining / (1024 ** 3)
-            calculated_size = target_space_gb - hdd_space_remaining_gb
-            directory = directory_to_clean
-            self.log_signal.emit(f"Target path: {directory_to_clean}")
-            self.log_signal.emit(f"{hdd_path} Drive's target size: {target_space_gb:.2f} GB")
-            self.log_signal.emit(f"{hdd_path} Drive's remaining size: {hdd_space_remaining_gb:.2f} GB")
-            if hdd_space_remaining < target_space_gb * (1024 ** 3):  # Convert target_space_gb to bytes
-                self.log_signal.emit(f"Total Deleting files size: {calculated_size:.2f} GB.")
-                self.delete_files_until_target_size(hdd_path, target_space_gb * (1024 ** 3), directory_to_clean)
-                self.delete_empty_folders(directory)
-        else:
-            self.status_signal.emit(f"Stopped")
-
-    def get_hdd_space_remaining(self, hdd_path):
-        print("get hdd remaining size")
-        hdd_stats = psutil.disk_usage(hdd_path)
-        hdd_space_remaining = hdd_stats.free
-        print(f"{hdd_space_remaining}")
-        return hdd_space_remaining
-
-    def delete_files_until_target_size(self, hdd_path, target_size_bytes, directory_to_clean):
-        # Get files and their sizes and modification times
-        file_data = []
-        for file_path in self.get_files_to_delete_by_size(directory_to_clean):
-            try:
-                file_size = os.path.getsize(file_path)
-                file_mtime = os.path.getmtime(file_path)
-                file_data.append((file_path, file_size, file_mtime))
-            except Exception as e:
-                self.status_signal.emit(f"Error reading file data: {e}")
-                self.log_signal.emit(f"Error: {e}")
-
-        # Sort by modification time (oldest first)
-        file_data.sort(key=lambda x: x[2])
-
-        space_freed = 0
-        hdd_space_remaining = self.get_hdd_space_remaining(hdd_path)
-        for file_path, file_size, _ in file_data:
-            if hdd_space_remaining >= target_size_bytes:
-                break
-
-            deleted_size = self.delete_file(file_path)
-            hdd_space_remaining += deleted_size
-            
-    def delete_files_batch(self, files_to_delete):
-        for file_path in files_to_delete:
-            try:
-                self.delete_file(file_path)
-            except Exception as e:
-                self.status_signal.emit(f"Error deleting file: {e}")
-                self.log_signal.emit(f"Error: {e}")
-
-    
-    def delete_file(self, file_path):
-        global global_slow_mode
-        if self.monitoring == True:
-            try:
-                file_name = os.path.basename(file_path)
-                directory = os.path.dirname(file_path)
-                self.status_signal.emit(f"Deleting {file_name}")
-                self.log_signal.emit(f"Deleting {file_name}")
-
-                file_size = 0
-                if os.path.isfile(file_path):
-                    file_size = os.path.getsize(file_path)
-                    os.remove(file_path)
-                    self.deleted_dirs.add(directory)  # Add the directory to the set
-                    if global_slow_mode:
-                        time.sleep(0.02)
-
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-                    if global_slow_mode:
-                        time.sleep(0.02)
-
-                # Update the space after deletion
-                return file_size
-
-            except Exception as e:
-                self.status_signal.emit(f"Error deleting file or directory: {e}")
-                self.log_signal.emit(f"Error: {e}")
-
-            # Check only directories where files have been deleted
-            for directory in self.deleted_dirs:
-                self.delete_empty_folders(directory)
-        else:
-            self.status_signal.emit(f"Stopped")
-
-        self.deleted_dirs.clear()
-
-        return 0
-
-    def get_files_to_delete_by_size(self, directory):
-        current_time = time.time()
-        files_to_delete = []
-        
-        if self.monitoring == True:
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    files_to_delete.append(file_path)
-        else:
-            self.status_signal.emit(f"Stopped")
-
-        return files_to_delete
-
-    def delete_files_by_period(self, directory, target_period_days):
-        current_time = time.time()
-        deleted_files = []
-        self.log_signal.emit(f"Target Path: {directory}.")
-        self.log_signal.emit(f"Delete all the files older than {target_period_days} day(s).")
-        if self.monitoring == True:
-            if os.path.isfile(directory):
-                self.delete_files_in_file_condition(directory, current_time, target_period_days)
-            elif os.path.isdir(directory):
-                print("period 5")
-                self.delete_files_in_directory_condition(directory, current_time, target_period_days)
-            self.delete_empty_folders(directory)
-        else:
-            self.status_signal.emit(f"Stopped")
-
-        return deleted_files
-            
-    def delete_files_in_file_condition(self, directory, file_path, current_time, target_period_days):
-        global global_slow_mode
-
-        if not self.monitoring:
-            self.status_signal.emit(f"Stopped")
-            return
-
-        try:
-            file_last_modified_time = os.path.getmtime(file_path)
-            time_difference = current_time - file_last_modified_time
-            if time_difference >= target_period_days * 24 * 60 * 60:
-                if os.path.isfile(file_path):
-                    file_name = os.path.basename(file_path)
-                    self.status_signal.emit(f"Deleting {file_name}")
-                    self.log_signal.emit(f"Deleting {file_name}")
-                    os.remove(file_path)
-                    self.delete_empty_folders(directory)
-                    if global_slow_mode:
-                        time.sleep(0.02)
-        except Exception as e:
-            self.status_signal.emit(f"Error deleting file: {e}")
-            self.log_signal.emit(f"Error: {e}")
-
-
-            
-    def delete_files_in_directory_condition(self, directory, current_time, target_period_days):
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                if not self.monitoring:
-                    return
-
-                file_path = os.path.join(root, file)
-                try:
-                    file_last_modified_time = os.path.getmtime(file_path)
-                    time_difference = current_time - file_last_modified_time
-                    if time_difference >= target_period_days * 24 * 60 * 60:
-                        file_name = os.path.basename(file_path)
-                        self.status_signal.emit(f"Deleting {file_name}")
-                        self.log_signal.emit(f"Deleting {file_name}")
-                        os.remove(file_path)
-                        
-                        if global_slow_mode:
-                            time.sleep(0.02)
-                except Exception as e:
-                    self.status_signal.emit(f"Error deleting files: {e}")
-                    self.log_signal.emit(f"Error: {e}")
-
-            # Immediately delete empty folders in the current root after all files have been deleted
-            for dir in dirs:
-                dir_path = os.path.join(root, dir)
-                if not os.listdir(dir_path):
-                    self.status_signal.emit(f"Deleting Empty Directory: {dir_path}")
-                    os.rmdir(dir_path)
-
-
-                
-    def enter_interval_and_update_status(self):
-        remaining_seconds = self.monitoring_interval * 60  # Convert minutes to seconds
-        print(f"{remaining_seconds}")
-        self.log_signal.emit(f"Waiting for next cycle: {self.monitoring_interval} min(s)")
-        while remaining_seconds > 0:
-            minutes = remaining_seconds // 60
-            seconds = remaining_seconds % 60
-            countdown_text = f"Next monitoring will start in...{minutes}min {seconds}sec"
-            self.countdown_signal.emit(countdown_text)
-            QThread.sleep(1)  # Sleep for 1 second
-            remaining_seconds -= 1
-            self.status_signal.emit(f"Next Monitoring will start in {minutes}min {seconds}sec")
-        
-        self.status_signal.emit("Monitoring")  # Emit "Monitoring" status signal
-        self.log_signal.emit("Next monitoring cycle starting.")
-        
-    def delete_empty_folders(self, directory):
-        if not self.monitoring:
-            return
-
-        def try_delete_empty_folder(folder_path):
-            try:
-                if not os.listdir(folder_path):  # Check if folder is empty
-                    self.status_signal.emit(f"Deleting Empty Directory: {folder_path}")
-                    os.rmdir(folder_path)
-            except Exception as e:
-                self.status_signal.emit(f"Error deleting folder: {e}")
-                self.log_signal.emit(f"Error: {e}")
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            for root, dirs, _ in os.walk(directory, topdown=False):
-                folder_paths = [os.path.join(root, d) for d in dirs]
-                executor.map(try_delete_empty_folder, folder_paths)
-                        
-    def set_max_workers(self, max_workers):
-        self.max_workers = max_workers
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("progress_interval", LOG_REFRESH_MS / 1000)
+        super().__init__(*args, **kwargs)
+        self.log_batcher = LogBatcher(self.log_batch_signal.emit, LOG_REFRESH_MS / 1000)
+        self.log_signal.connect(self.log_batcher.add)
+        self.finished.connect(self.log_batcher.flush)
+        self.finished.connect(self.progress.flush)
 
 
 class AutoScrollTextEdit(QTextEdit):
@@ -361,39 +122,19 @@ class DiskMonitorApp(QMainWindow):
                 csv_writer.writerows(initial_content)
             
     def load_conditions_from_csv(self):
-        csv_path = "D:/Program/RVS/Autodelete/targetlist.csv"
-        
+        # Parsing is shared with the headless CLI
+        try:
+            target_list = load_target_list(TARGET_CSV_PATH)
+        except (OSError, KeyError, ValueError) as e:
+            self.update_log(f"Error reading {TARGET_CSV_PATH}, conditions not refreshed: {e}")
+            return False
+
         self.target_list.clear()
         self.target_list_widget.clear()
-        
-        rows = []
-        if os.path.exists(csv_path):
-            with open(csv_path, "r") as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    hdd_path = row["HDD"]
-                    directory_to_clean = row["Directory"]
-                    
-                    target_space_gb = row["Space (GB)"]
-                    if target_space_gb:
-                        target_space_gb = float(target_space_gb)
-                    else:
-                        target_space_gb = None
-                    
-                    target_period_days = row["Period (Days)"]
-                    if target_period_days:
-                        target_period_days = int(target_period_days)
-                    else:
-                        target_period_days = None
-                    
-                    self.target_list.append((hdd_path, directory_to_clean, target_space_gb, target_period_days))
-                    condition_text = f"HDD: {hdd_path} | Directory: {directory_to_clean}"
-                    if target_space_gb is not None:
-                        condition_text += f" | Space: {target_space_gb} GB"
-                    if target_period_days is not None:
-                        condition_text += f" | Period: {target_period_days} Days"
-                    list_item = QListWidgetItem(condition_text)
-                    self.target_list_widget.addItem(list_item)
+        for condition in target_list:
+            self.target_list.append(condition)
+            self.add_condition_item_to_list_widget(condition)
+        return True
 
     def __init__(self):
         super().__init__()
@@ -405,7 +146,11 @@ class DiskMonitorApp(QMainWindow):
         self.setWindowTitle("Autodelete v1.0.0.5_Modified Version")
         self.setGeometry(100, 100, 820, 560)
         
-        atexit.register(self.save_log)
+        # Log lines and per-deletion audit records are written by a background thread
+        self.file_logger = FileLogger(LOG_FOLDER)
+        atexit.register(self.file_logger.close)
+        # Shared by every monitoring thread, so counters survive a restart; scraped from METRICS_PATH
+        self.metrics = MonitorMetrics(METRICS_PATH)
         
         self.monitoring_thread = MonitoringThread([], 0, 0)
         
@@ -443,6 +188,10 @@ class DiskMonitorApp(QMainWindow):
         self.target_period_entry = QLineEdit(self)
         self.target_period_entry.setGeometry(140, 140, 150, 20)
 
+        # Age Mode "folders": remove whole dated/old subfolders instead of checking every file
+        self.folder_age_checkbox = QCheckBox("Whole Folders", self)
+        self.folder_age_checkbox.setGeometry(300, 140, 120, 20)
+
         self.add_condition_button = QPushButton("Add Condition", self)
         self.add_condition_button.setGeometry(20, 180, 80, 30)
         self.add_condition_button.clicked.connect(self.add_condition)
@@ -473,12 +222,35 @@ class DiskMonitorApp(QMainWindow):
         #self.countdown_label.setGeometry(450, 20, 200, 20)
         self.countdown_label.setGeometry(450, 170, 340, 20)
 
+        # Targets cleaned at once per drive, e.g. "E:=2"; drives not listed clean one target at a time
+        self.drive_limits_label = QLabel("Drive Limits:", self)
+        self.drive_limits_label.setGeometry(450, 125, 80, 20)
+
+        self.drive_limits_entry = QLineEdit(self)
+        self.drive_limits_entry.setGeometry(530, 125, 260, 20)
+        self.drive_limits_entry.setPlaceholderText("D:=1, E:=2")
+
+        # A size target re-reads the drive's real free space after deleting this much
+        self.checkpoint_label = QLabel("Checkpoint (GB):", self)
+        self.checkpoint_label.setGeometry(450, 150, 100, 20)
+
+        self.checkpoint_entry = QLineEdit(self)
+        self.checkpoint_entry.setGeometry(550, 150, 60, 20)
+        self.checkpoint_entry.setText("1")
+
         self.log_label = QLabel("Log:", self)
-        self.log_label.setGeometry(450, 130, 50, 20)
+        self.log_label.setGeometry(450, 175, 50, 20)
 
-        self.log_text_edit = QTextEdit(self)
-        self.log_text_edit.setGeometry(450, 150, 340, 370)
+        # Append-only view; Qt drops the oldest blocks past LOG_CAPACITY
+        self.log_text_edit = QPlainTextEdit(self)
+        self.log_text_edit.setGeometry(450, 195, 340, 325)
         self.log_text_edit.setReadOnly(True)
+        self.log_text_edit.setMaximumBlockCount(LOG_CAPACITY)
+
+        self.log_buffer = LogRingBuffer(LOG_CAPACITY)
+        self.log_refresh_timer = QTimer()
+        self.log_refresh_timer.timeout.connect(self.refresh_log_view)
+        self.log_refresh_timer.start(LOG_REFRESH_MS)
         
         self.monitoring_interval_label = QLabel("Monitoring Interval (Mins):", self)
         self.monitoring_interval_label.setGeometry(450, 50, 170, 20)
@@ -492,6 +264,15 @@ class DiskMonitorApp(QMainWindow):
         self.slowmode_checkbox.setChecked(True)
         self.slowmode_checkbox.stateChanged.connect(self.update_slow_mode)
         
+        self.watchmode_checkbox = QCheckBox("Watch Mode", self)
+        self.watchmode_checkbox.setGeometry(630, 80, 160, 20)
+        self.watchmode_checkbox.setChecked(False)
+
+        # Plan the next cycle from how fast the drives fill, Monitoring Interval x4 at most
+        self.adaptive_checkbox = QCheckBox("Adaptive Interval", self)
+        self.adaptive_checkbox.setGeometry(630, 100, 160, 20)
+        self.adaptive_checkbox.setChecked(False)
+
         self.autohide_checkbox = QCheckBox("Auto Hide Mode", self)
         self.autohide_checkbox.setGeometry(450, 100, 170, 20)
         self.autohide_checkbox.setChecked(True)
@@ -531,9 +312,10 @@ class DiskMonitorApp(QMainWindow):
         
         self.monitoring_thread = MonitoringThread([], 0, 0)
         self.monitoring_thread.status_signal.connect(self.update_status)  # Connect status signal
-        self.monitoring_thread.log_signal.connect(self.update_log)  # Connect log signal
+        self.monitoring_thread.log_batch_signal.connect(self.update_log_batch)  # Connect batched log signal
         #self.monitoring_thread.dot_signal.connect(self.update_status)  # Connect dot signal for status updates
         self.monitoring_thread.countdown_signal.connect(self.update_countdown)  # Connect countdown signal
+        self.monitoring_thread.progress_signal.connect(self.update_progress)  # Throttled deletion progress
         
         font = QFont()
         font.setBold(True)
@@ -543,16 +325,40 @@ class DiskMonitorApp(QMainWindow):
         
         monitoring_interval = int(self.monitoring_interval_entry.text())
         self.update_log("START MONITORING")
-        self.monitoring_thread = MonitoringThread(self.target_list, monitoring_interval, 0)  # Use max_workers = 0 initially
+        self.monitoring_thread = MonitoringThread(self.target_list, monitoring_interval, 0, INDEX_PATH, self.watchmode_checkbox.isChecked(),
+                                                  self.drive_limits(), checkpoint_bytes=self.checkpoint_bytes(),
+                                                  metrics=self.metrics, resume_dir=RESUME_PATH,
+                                                  adaptive_interval=self.adaptive_checkbox.isChecked(),
+                                                  config_path=TARGET_CSV_PATH)  # Use max_workers = 0 initially
+        self.monitoring_thread.file_logger = self.file_logger
 
         self.monitoring_thread.status_signal.connect(self.update_status)
-        self.monitoring_thread.log_signal.connect(self.update_log)
+        self.monitoring_thread.log_batch_signal.connect(self.update_log_batch)
         self.monitoring_thread.countdown_signal.connect(self.update_countdown)
+        self.monitoring_thread.progress_signal.connect(self.update_progress)  # Throttled deletion progress
+        self.monitoring_thread.targets_signal.connect(self.show_reloaded_targets)  # Hot-reloaded target list
 
         # Start the monitoring thread
         self.monitoring_thread.start()
         self.update_status()
         
+    def drive_limits(self):
+        try:
+            return parse_drive_limits(self.drive_limits_entry.text())
+        except ValueError as e:
+            self.update_log(f"Invalid Drive Limits, cleaning one target per drive: {e}")
+            return None
+
+    def checkpoint_bytes(self):
+        try:
+            checkpoint_gb = float(self.checkpoint_entry.text())
+            if checkpoint_gb <= 0:
+                raise ValueError(f"{checkpoint_gb:g} is not above 0")
+        except ValueError as e:
+            self.update_log(f"Invalid Checkpoint, using 1 GB: {e}")
+            checkpoint_gb = 1
+        return checkpoint_gb * (1024 ** 3)
+
     def update_max_workers(self):
         try:
             self.max_workers = 8
@@ -581,24 +387,33 @@ class DiskMonitorApp(QMainWindow):
     
     def refresh_condition(self):
         # Code to reload the CSV file and update your conditions
-        self.load_conditions_from_csv()
-        self.update_log("Conditions refreshed")
+        if self.load_conditions_from_csv():
+            self.update_log("Conditions refreshed")
     
     def update_slow_mode(self, state):
-        global global_slow_mode  # Declare that you're using the global variable
+        # The flag lives in monitor.py, where the deletion engine reads it
         print("Slow mode state changed")
         if state == Qt.Checked:
-            global_slow_mode = True  # Update the global variable
+            monitor.global_slow_mode = True  # Update the global variable
             print("Changed to True")
         else:
-            global_slow_mode = False  # Update the global variable
+            monitor.global_slow_mode = False  # Update the global variable
             print("Changed to False")
             
+    def show_reloaded_targets(self, target_list):
+        # The running thread already uses the new list; keep the editor in step with it
+        self.target_list[:] = target_list
+        self.target_list_widget.clear()
+        for condition in self.target_list:
+            self.add_condition_item_to_list_widget(condition)
+
+    def update_progress(self, snapshot):
+        self.update_status(snapshot.text())
+
     def update_status(self, status=""):
-        print(f"Received status signal: {status}")
         if "Deleting" in status:
             formatted_status = f"<span style='color: blue; font-weight: bold;'>{status}</span>"
-        if "Next Monitoring" in status:
+        elif "Next Monitoring" in status:
             formatted_status = f"<span style='color: red; font-weight: bold;'>{status}</span>"
         else:
             formatted_status = status
@@ -608,20 +423,31 @@ class DiskMonitorApp(QMainWindow):
         
     def save_conditions_to_csv(self):
         csv_path = "D:/Program/RVS/Autodelete/targetlist.csv"
-        fieldnames = ["HDD", "Directory", "Space (GB)", "Period (Days)"]
+        fieldnames = ["HDD", "Directory", "Space (GB)", "Period (Days)", "Age Mode", "Include", "Exclude",
+                      "Min Size (MB)", "Max Size (MB)", "Priority", "Shared"]
 
-        with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
+        # Written to a temp file and swapped in, so the running thread's reload never sees half a file
+        temp_path = csv_path + ".tmp"
+        with open(temp_path, "w", newline="", encoding="utf-8") as csvfile:
             csv_writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             csv_writer.writeheader()
 
             for condition in self.target_list:
-                hdd_path, directory_to_clean, target_space_gb, target_period_days = condition
+                condition = Target(*condition)
                 csv_writer.writerow({
-                    "HDD": hdd_path,
-                    "Directory": directory_to_clean,
-                    "Space (GB)": target_space_gb,
-                    "Period (Days)": target_period_days
+                    "HDD": condition.hdd_path,
+                    "Directory": condition.directory,
+                    "Space (GB)": condition.space_gb,
+                    "Period (Days)": condition.period_days,
+                    "Age Mode": condition.age_mode,
+                    "Include": condition.include,
+                    "Exclude": condition.exclude,
+                    "Min Size (MB)": condition.min_size_mb,
+                    "Max Size (MB)": condition.max_size_mb,
+                    "Priority": condition.priority,
+                    "Shared": condition.shared
                 })
+        os.replace(temp_path, csv_path)
 
     def add_condition(self):
         hdd_path = self.hdd_choice.currentText()
@@ -639,7 +465,9 @@ class DiskMonitorApp(QMainWindow):
         else:
             target_period_days = None
 
-        condition = (hdd_path, directory_to_clean, target_space_gb, target_period_days)
+        age_mode = "folders" if self.folder_age_checkbox.isChecked() else "files"
+
+        condition = Target(hdd_path, directory_to_clean, target_space_gb, target_period_days, age_mode)
         self.target_list.append(condition)
 
         self.add_condition_item_to_list_widget(condition)
@@ -648,17 +476,28 @@ class DiskMonitorApp(QMainWindow):
         self.directory_entry.clear()
         self.target_space_entry.clear()
         self.target_period_entry.clear()
+        self.folder_age_checkbox.setChecked(False)
 
         self.save_conditions_to_csv()  # Save the updated conditions to the CSV file
 
     def add_condition_item_to_list_widget(self, condition):
-        hdd_path, directory_to_clean, target_space_gb, target_period_days = condition
+        hdd_path, directory_to_clean, target_space_gb, target_period_days, age_mode = Target(*condition)[:5]
 
         item_text = f"HDD: {hdd_path} | Directory: {directory_to_clean}"
         if target_space_gb is not None:
             item_text += f" | Space: {target_space_gb} GB"
         if target_period_days is not None:
             item_text += f" | Period: {target_period_days} Days"
+            if age_mode == "folders":
+                item_text += " (Whole Folders)"
+        # Filter columns are edited in targetlist.csv; show them so the list matches what runs
+        file_filter = target_filter(condition)
+        if file_filter is not None:
+            item_text += f" | Filter: {file_filter.name}"
+        if Target(*condition).priority:
+            item_text += f" | Priority: {Target(*condition).priority}"
+        if Target(*condition).shared:
+            item_text += f" | Shared: {Target(*condition).shared}"
 
         list_item = QListWidgetItem(item_text)
         self.target_list_widget.addItem(list_item)
@@ -733,8 +572,7 @@ class DiskMonitorApp(QMainWindow):
     def start_monitoring(self):
         self.update_max_workers()  # Update max_workers based on user input
         if self.monitoring_thread is not None and self.monitoring_thread.isRunning():
-            self.monitoring_thread.terminate()
-            self.monitoring_thread.wait(5000)
+            self.stop_monitoring_thread()
             self.update_status("Stopped")  # Set the status to "Stopped"
             self.update_log("Stopped monitoring for all conditions.")
         else:
@@ -743,12 +581,19 @@ class DiskMonitorApp(QMainWindow):
 
             # Create a new instance of MonitoringThread with max_workers
             self.update_log("START MONITORING")
-            self.monitoring_thread = MonitoringThread(self.target_list, monitoring_interval, 0)  # Use max_workers = 0 initially
+            self.monitoring_thread = MonitoringThread(self.target_list, monitoring_interval, 0, INDEX_PATH, self.watchmode_checkbox.isChecked(),
+                                                      self.drive_limits(), checkpoint_bytes=self.checkpoint_bytes(),
+                                                      metrics=self.metrics, resume_dir=RESUME_PATH,
+                                                      adaptive_interval=self.adaptive_checkbox.isChecked(),
+                                                      config_path=TARGET_CSV_PATH)  # Use max_workers = 0 initially
+            self.monitoring_thread.file_logger = self.file_logger
 
             # Connect signals from the monitoring thread
             self.monitoring_thread.status_signal.connect(self.update_status)  # Connect status signal
-            self.monitoring_thread.log_signal.connect(self.update_log)  # Connect log signal
+            self.monitoring_thread.log_batch_signal.connect(self.update_log_batch)  # Connect batched log signal
             self.monitoring_thread.countdown_signal.connect(self.update_countdown)  # Connect countdown signal
+            self.monitoring_thread.progress_signal.connect(self.update_progress)  # Throttled deletion progress
+            self.monitoring_thread.targets_signal.connect(self.show_reloaded_targets)  # Hot-reloaded target list
 
             # Start the monitoring thread
             self.monitoring_thread.start()
@@ -756,60 +601,60 @@ class DiskMonitorApp(QMainWindow):
 
     def stop_monitoring(self):
         if self.monitoring_thread is not None and self.monitoring_thread.isRunning():
-            self.monitoring_thread.monitoring = False
-            self.monitoring_thread.terminate()
-            self.monitoring_thread.wait(5000)
+            self.stop_monitoring_thread()
             self.update_status("Stopped")  # Set the status to "Stopped"
             self.update_log("Stopped monitoring for all conditions.")
         else:
             self.update_log("No monitoring thread to stop.")
+
+    def stop_monitoring_thread(self):
+        # Cooperative stop instead of terminate(): the worker ends after the file it is deleting
+        # and saves its place, so the next start resumes the target instead of walking it again
+        self.monitoring_thread.stop()
+        if not self.monitoring_thread.wait(5000):
+            self.update_log("Monitoring will stop after the current delete finishes.")
         
     def update_log(self, log_message, save_log=True):
         timestamped_log_message = f"[{datetime.now()}] {log_message}"
-        current_log = self.log_text_edit.toPlainText()
-        updated_log = current_log + timestamped_log_message + '\n'
-        
-        # Count the number of lines
-        line_count = updated_log.count('\n')
-        
-        if line_count > 200 and save_log:
-            self.save_log()
-            self.clear_log()
-            updated_log = timestamped_log_message + '\n'  # Start over with the latest log message
+        self.update_log_batch([timestamped_log_message], save_log)
 
-        self.log_text_edit.setPlainText(updated_log)
+    def update_log_batch(self, log_lines, save_log=True):
+        # Lines are only buffered here; refresh_log_view appends them at LOG_REFRESH_MS
+        # and the file sink writes them in the background
+        self.log_buffer.extend(log_lines)
+        if save_log:
+            self.file_logger.log_lines(log_lines)
 
-        # Scroll to the bottom
-        cursor = self.log_text_edit.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.log_text_edit.setTextCursor(cursor)
-        self.log_text_edit.ensureCursorVisible()
-        
-    log_signal = pyqtSignal(str)
+    def refresh_log_view(self):
+        # Also picks up the tail of a batch and the latest progress the worker has not published yet
+        self.monitoring_thread.log_batcher.flush()
+        self.monitoring_thread.progress.flush()
+
+        log_lines = self.log_buffer.take_pending()
+        if log_lines:
+            self.log_text_edit.appendPlainText("\n".join(log_lines))
+
+            # Scroll to the bottom
+            scroll_bar = self.log_text_edit.verticalScrollBar()
+            scroll_bar.setValue(scroll_bar.maximum())
         
     def quit_app(self):
-        self.update_log(f"User Closed App with Tray Icon", save_log=False)
+        self.update_log(f"User Closed App with Tray Icon")
         self.system_tray_icon.hide()
+        if self.monitoring_thread.isRunning():
+            self.stop_monitoring_thread()  # Lets the worker save its resume state
         self.save_log()
+        self.file_logger.close()
         QApplication.quit()
         
     def clear_log(self):
         self.log_text_edit.clear()
+        self.log_buffer.clear()
 
     def save_log(self):
-        log_content = self.log_text_edit.toPlainText()
-        if log_content:
-            timestamp = datetime.now().strftime("%Y%m%d")
-            log_filename = f"AutodeleteLog_{timestamp}.txt"
-            log_folder = os.path.join("D:/Program/RVS/Autodelete/Log")
-            os.makedirs(log_folder, exist_ok=True)  # Create directory if it doesn't exist
-            log_path = os.path.join(log_folder, log_filename)
-            
-            # Append to the log file or create it if it doesn't exist
-            with open(log_path, "a", encoding="utf-8") as log_file:
-                log_file.write(log_content)
-            
-            self.update_log(f"Log saved as: {log_path}", save_log=False)  # Avoid triggering save_log recursively
+        # Every line is already queued for the log file; wait until it is on disk
+        self.file_logger.flush()
+        self.update_log(f"Log saved as: {self.file_logger.message_log_path()}", save_log=False)
             
     def log_exception(self, e):
         error_message = str(e)
@@ -0,0 +1,168 @@
+import argparse
+import multiprocessing
+import signal
+import sys
+from datetime import datetime
+
+import monitor
+from monitor import INDEX_PATH, TARGET_CSV_PATH, MonitoringCore, load_target_list
+from filelog import FileLogger
+from metrics import MonitorMetrics, serve_metrics
+from scheduler import parse_drive_limits
+
+# Exit codes
+EXIT_OK = 0
+EXIT_ERRORS = 1
+EXIT_CONFIG = 2
+
+
+class HeadlessMonitor(MonitoringCore):
+    # MonitoringCore with its signals printed to stdout instead of a Qt window
+    def __init__(self, *args, verbose=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.log_signal.connect(self.print_log)
+        if verbose:
+            self.status_signal.connect(self.print_log)
+            self.progress_signal.connect(self.print_progress)
+
+    def print_log(self, message):
+        print(f"[{datetime.now()}] {message}", flush=True)
+
+    def print_progress(self, snapshot):
+        self.print_log(snapshot.text())
+
+
+def drive_limits_arg(text):
+    try:
+        return parse_drive_limits(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="autodelete", description="Headless Autodelete cleaner")
+    parser.add_argument("--csv", default=TARGET_CSV_PATH, help="target list (default: %(default)s)")
+    parser.add_argument("--once", action="store_true", help="run one cycle and exit")
+    parser.add_argument("--interval", type=int, default=30, help="minutes between cycles (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=4, help="deletion worker threads (default: %(default)s)")
+    parser.add_argument("--index", default=None, help=f"file index path, e.g. {INDEX_PATH}")
+    parser.add_argument("--watch", action="store_true", help="react to filesystem events between cycles")
+    parser.add_argument("--drive-limit", type=drive_limits_arg, action="append", default=[], metavar="DRIVE=N",
+                        help="targets cleaned at once on DRIVE, e.g. D:=2 (default: 1 per drive; repeatable)")
+    parser.add_argument("--files-per-sec", type=float, default=None, help="deletion rate limit per drive")
+    parser.add_argument("--bytes-per-sec", type=float, default=None, help="deletion bandwidth limit per drive")
+    parser.add_argument("--checkpoint-gb", type=float, default=1,
+                        help="re-read a drive's real free space after deleting this many GB (default: %(default)s)")
+    parser.add_argument("--no-slow-mode", action="store_true", help="do not cap deletion at Slow Mode rate")
+    parser.add_argument("--verbose", action="store_true", help="also print status and deletion progress")
+    parser.add_argument("--progress-interval", type=float, default=1.0,
+                        help="seconds between progress lines with --verbose (default: %(default)s)")
+    parser.add_argument("--plan", metavar="PATH", default=None,
+                        help="dry run: write the deletion plan to PATH and exit without deleting")
+    parser.add_argument("--execute-plan", metavar="PATH", default=None,
+                        help="delete the files listed in a plan written by --plan, without scanning")
+    parser.add_argument("--log-dir", default=None,
+                        help="also write rotating log and deletion audit files to this folder")
+    parser.add_argument("--metrics-file", metavar="PATH", default=None,
+                        help="write Prometheus text metrics to PATH after every target")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--resume-dir", default=None,
+                        help="save per-target progress here so an interrupted cycle resumes where it stopped")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="plan each wait from the drives' fill rates, between --min-interval and 4x --interval")
+    parser.add_argument("--min-interval", type=float, default=1,
+                        help="shortest adaptive wait in minutes (default: %(default)s)")
+    parser.add_argument("--async", dest="async_engine", action="store_true",
+                        help="run targets as asyncio tasks with overlapping scan and delete stages")
+    parser.add_argument("--reload", action="store_true",
+                        help="apply changes to the --csv target list between cycles without restarting")
+    parser.add_argument("--scan-processes", type=int, default=0,
+                        help="walk period targets in this many worker processes (default: in this process)")
+    parser.add_argument("--lease-dir",
+                        help="folder, reachable from every station, through which cleaners split the targets "
+                             "that have a Shared label")
+    parser.add_argument("--lease-ttl", type=float, default=300,
+                        help="seconds before a crashed cleaner's lease expires; must exceed the stations' "
+                             "clock skew (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    try:
+        target_list = load_target_list(args.csv)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error reading {args.csv}: {e}", file=sys.stderr)
+        return EXIT_CONFIG
+    if not target_list and not args.execute_plan:
+        print(f"No targets in {args.csv}", file=sys.stderr)
+        return EXIT_CONFIG
+
+    metrics = None
+    if args.metrics_file or args.metrics_port is not None:
+        metrics = MonitorMetrics(args.metrics_file)
+        if args.metrics_port is not None:
+            try:
+                serve_metrics(metrics.registry, args.metrics_port)
+            except OSError as e:
+                print(f"Error serving metrics on port {args.metrics_port}: {e}", file=sys.stderr)
+                return EXIT_CONFIG
+
+    monitor.global_slow_mode = not args.no_slow_mode
+    drive_limits = {}
+    for limits in args.drive_limit:
+        drive_limits.update(limits)
+    cleaner = HeadlessMonitor(target_list, args.interval, args.workers, args.index, args.watch, drive_limits,
+                              files_per_sec=args.files_per_sec, bytes_per_sec=args.bytes_per_sec,
+                              checkpoint_bytes=args.checkpoint_gb * (1024 ** 3),
+                              progress_interval=args.progress_interval, metrics=metrics,
+                              resume_dir=args.resume_dir, adaptive_interval=args.adaptive,
+                              min_interval=args.min_interval, scan_processes=args.scan_processes,
+                              async_engine=args.async_engine, config_path=args.csv if args.reload else None,
+                              lease_dir=args.lease_dir, lease_ttl=args.lease_ttl, verbose=args.verbose)
+
+    file_logger = None
+    if args.log_dir:
+        file_logger = FileLogger(args.log_dir)
+        cleaner.file_logger = file_logger
+        cleaner.log_signal.connect(lambda message: file_logger.log_lines([f"[{datetime.now()}] {message}"]))
+
+    def stop(signum, frame):
+        cleaner.stop()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        if args.plan:
+            cleaner.open_file_index()
+            cleaner.plan_cycle(args.plan)
+        elif args.execute_plan:
+            cleaner.execute_plan(args.execute_plan)
+        elif args.once:
+            cleaner.open_file_index()
+            cleaner.open_resume_store()
+            cleaner.open_scan_pipeline()
+            cleaner.open_lease_manager()
+            if args.async_engine:
+                import asyncio
+                from asyncengine import AsyncEngine
+                asyncio.run(AsyncEngine(cleaner).run_once())
+            else:
+                cleaner.run_cycle()
+        else:
+            cleaner.run()
+    finally:
+        cleaner.close_scan_pipeline()
+        cleaner.close_lease_manager()
+        if file_logger is not None:
+            file_logger.close()
+
+    return EXIT_ERRORS if cleaner.error_count else EXIT_OK
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Scan worker processes in a frozen Windows build
+    sys.exit(main())
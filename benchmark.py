@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import psutil
+
+import monitor
+from metrics import MonitorMetrics
+from monitor import MonitoringCore
+
+# Throughput benchmark for the deletion modes. Builds a synthetic tree in a temp dir, runs one mode
+# headlessly against it and appends the result to a JSON-lines file for comparison across versions:
+#   python benchmark.py --files 200000 --layout autogen --modes period,size,prune
+
+DAY = 24 * 60 * 60
+MODES = ("period", "size", "prune")
+
+
+def skewed_age(rng, max_age_days):
+    # Most files are recent, with a long tail of old ones, like a station that is cleaned regularly
+    return min(max_age_days, rng.expovariate(1 / (max_age_days / 4))) * DAY
+
+
+def autogen_paths(rng, file_count):
+    # AutoGenerated/DB<n>/<YYYYMMDD>/<HH>/<recipe>/<lot>_<n>.db : deep, date-named folders
+    start = datetime(2024, 1, 1)
+    for i in range(file_count):
+        day = start + timedelta(days=rng.randrange(60))
+        yield os.path.join("AutoGenerated", f"DB{rng.randrange(4)}", f"{day:%Y%m%d}", f"{rng.randrange(24):02d}",
+                           f"recipe{rng.randrange(8)}", f"lot{rng.randrange(1000):04d}_{i}.db")
+
+
+def pocb_paths(rng, file_count):
+    # POCB/HEX/<lot>/<wafer>/<chip>.hex : wide folders of small files
+    for i in range(file_count):
+        yield os.path.join("POCB", "HEX", f"L{rng.randrange(200):04d}", f"W{rng.randrange(25):02d}", f"{i:08d}.hex")
+
+
+LAYOUTS = {"autogen": autogen_paths, "pocb": pocb_paths}
+
+
+def generate_tree(root, layout="autogen", file_count=10000, max_age_days=60, min_size=0, max_size=4096, seed=1):
+    # Returns (files, bytes) written under root. Sizes are uniform in [min_size, max_size],
+    # mtimes are skewed towards now by skewed_age.
+    rng = random.Random(seed)
+    now = time.time()
+    made_dirs = set()
+    total_bytes = 0
+    block = b"\0" * max_size
+    for relative_path in LAYOUTS[layout](rng, file_count):
+        path = os.path.join(root, relative_path)
+        folder = os.path.dirname(path)
+        if folder not in made_dirs:
+            os.makedirs(folder, exist_ok=True)
+            made_dirs.add(folder)
+        size = rng.randint(min_size, max_size)
+        with open(path, "wb") as data_file:
+            data_file.write(block[:size])
+        mtime = now - skewed_age(rng, max_age_days)
+        os.utime(path, (mtime, mtime))
+        total_bytes += size
+    return file_count, total_bytes
+
+
+class RssSampler:
+    # Peak resident memory of this process while a benchmark runs, polled from a daemon thread
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self.running = False
+        self.thread = None
+
+    def sample(self):
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def start(self):
+        self.running = True
+        self.sample()
+        self.thread = threading.Thread(target=self.poll, daemon=True)
+        self.thread.start()
+
+    def poll(self):
+        while self.running:
+            self.sample()
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.sample()
+        return self.peak
+
+
+def io_counters():
+    # Read/write syscall counts where the platform reports them (Linux /proc, Windows)
+    try:
+        counters = psutil.Process().io_counters()
+    except (AttributeError, psutil.Error):
+        return None
+    return counters.read_count, counters.write_count
+
+
+class BenchMonitor(MonitoringCore):
+    # Free space is simulated from the bytes deleted, so the size mode does not depend on the real drive
+    def __init__(self, *args, simulated_free=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.simulated_free = simulated_free
+        self.log_lines = []
+        self.log_signal.connect(self.log_lines.append)
+
+    def get_hdd_space_remaining(self, hdd_path):
+        return self.simulated_free + self.progress.totals()[1]
+
+
+def run_mode(mode, root, total_bytes, workers=4, period_days=30, scan_processes=0):
+    metrics = MonitorMetrics()
+    cleaner = BenchMonitor([], 0, workers, metrics=metrics, scan_processes=scan_processes)
+    cleaner.open_scan_pipeline()  # Worker start-up is not part of the measurement
+    sampler = RssSampler()
+    io_before = io_counters()
+
+    sampler.start()
+    start_time = time.perf_counter()
+    if mode == "period":
+        cleaner.delete_files_by_period(root, period_days)
+    elif mode == "size":
+        # Ask for half of the tree, oldest first
+        cleaner.delete_files_until_target_size(root, total_bytes // 2, root, 0)
+    elif mode == "prune":
+        # Everything is expired, so the whole tree is emptied and every folder pruned
+        cleaner.delete_files_by_period(root, 0)
+    seconds = time.perf_counter() - start_time
+    peak_rss = sampler.stop()
+    io_after = io_counters()
+    cleaner.close_scan_pipeline()
+    metrics.close()
+
+    files, size = cleaner.progress.totals()
+    folders = cleaner.progress.snapshot().folders
+    syscalls = {"stat": metrics.stat_calls.values.get((), 0), "unlink": files, "rmdir": folders}
+    if io_before is not None and io_after is not None:
+        syscalls["read"] = io_after[0] - io_before[0]
+        syscalls["write"] = io_after[1] - io_before[1]
+    return {
+        "mode": mode,
+        "seconds": seconds,
+        "files": files,
+        "bytes": size,
+        "folders": folders,
+        "files_per_sec": files / seconds if seconds else None,
+        "bytes_per_sec": size / seconds if seconds else None,
+        "peak_rss": peak_rss,
+        "syscalls": syscalls,
+        "errors": cleaner.error_count,
+    }
+
+
+def code_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="benchmark", description="Autodelete deletion throughput benchmark")
+    parser.add_argument("--files", type=int, default=20000, help="files per generated tree (default: %(default)s)")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="autogen", help="tree layout (default: %(default)s)")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated modes (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=4, help="deletion worker threads (default: %(default)s)")
+    parser.add_argument("--max-age", type=int, default=60, help="oldest file age in days (default: %(default)s)")
+    parser.add_argument("--max-size", type=int, default=4096, help="largest file in bytes (default: %(default)s)")
+    parser.add_argument("--scan-processes", type=int, default=0,
+                        help="scan worker processes for period/prune, 0 for in-process (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the tree (default: %(default)s)")
+    parser.add_argument("--dir", default=None, help="where to build the tree (default: a temp dir)")
+    parser.add_argument("--output", default="bench_results.jsonl",
+                        help="JSON-lines file the results are appended to (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        print(f"Unknown mode(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    monitor.global_slow_mode = False  # Measure the engine, not the Slow Mode cap
+    run = {
+        "time": datetime.now().isoformat(),
+        "version": code_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "layout": args.layout,
+        "files": args.files,
+        "workers": args.workers,
+        "scan_processes": args.scan_processes,
+        "results": [],
+    }
+
+    for mode in modes:
+        root = tempfile.mkdtemp(prefix=f"autodelete_bench_{mode}_", dir=args.dir)
+        try:
+            generate_start = time.perf_counter()
+            _, total_bytes = generate_tree(root, args.layout, args.files, args.max_age, 0, args.max_size, args.seed)
+            print(f"{mode}: generated {args.files} files in {time.perf_counter() - generate_start:.1f}s", flush=True)
+
+            result = run_mode(mode, root, total_bytes, args.workers, scan_processes=args.scan_processes)
+            run["results"].append(result)
+            print(f"{mode}: {result['files']} files, {result['folders']} folders in {result['seconds']:.2f}s, "
+                  f"{result['files_per_sec']:.0f} files/s, {result['bytes_per_sec'] / 1024 ** 2:.1f} MiB/s, "
+                  f"peak RSS {result['peak_rss'] / 1024 ** 2:.0f} MiB, syscalls {result['syscalls']}", flush=True)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    with open(args.output, "a", encoding="utf-8") as output_file:
+        output_file.write(json.dumps(run) + "\n")
+    print(f"Results appended to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+import hashlib
+import io
+import os
+import threading
+
+# Polls the target list for changes from a background thread. A change is taken once the file's
+# mtime and size have stayed the same for one poll, so a half-written file is never parsed, and only
+# when its content hash differs from the last one applied, so saving the same rules again is a no-op.
+# The bytes that were hashed are the bytes that are parsed.
+
+
+class ConfigWatcher:
+    def __init__(self, path, parse, on_change, on_error=None, interval=2.0):
+        self.path = path
+        self.parse = parse  # Iterable of lines -> target list; raises ValueError/KeyError when invalid
+        self.on_change = on_change
+        self.on_error = on_error
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_signature = None
+        self.pending_signature = None
+        self.last_digest = None
+
+    def signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def read(self):
+        with open(self.path, "rb") as config_file:
+            return config_file.read()
+
+    def start(self):
+        # The rules already loaded are the baseline
+        self.last_signature = self.signature()
+        try:
+            self.last_digest = hashlib.sha1(self.read()).hexdigest()
+        except OSError:
+            self.last_digest = None
+        self.thread = threading.Thread(target=self.poll, name="config-watcher", daemon=True)
+        self.thread.start()
+
+    def poll(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def check(self):
+        signature = self.signature()
+        if signature is None or signature == self.last_signature:
+            self.pending_signature = None
+            return False
+        if signature != self.pending_signature:
+            self.pending_signature = signature  # Changed since the last poll, wait for it to settle
+            return False
+
+        self.last_signature = signature
+        self.pending_signature = None
+        try:
+            content = self.read()
+        except OSError as e:
+            self.report(e)
+            return False
+        digest = hashlib.sha1(content).hexdigest()
+        if digest == self.last_digest:
+            return False
+        try:
+            target_list = self.parse(io.StringIO(content.decode("utf-8-sig"), newline=""))
+        except (KeyError, ValueError) as e:
+            self.report(e)  # Keep running with the rules applied last
+            return False
+        self.last_digest = digest
+        self.on_change(target_list)
+        return True
+
+    def report(self, e):
+        if self.on_error is not None:
+            self.on_error(e)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,224 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+# Slow Mode used to sleep 0.02s after every delete, which is 50 files/sec
+SLOW_MODE_FILES_PER_SEC = 50
+
+
+class RateLimiter:
+    # Shared files/sec and bytes/sec budget for all deletion workers of one drive.
+    # Each acquire reserves the next free time slot, so workers sleep outside the lock.
+
+    def __init__(self, files_per_sec=None, bytes_per_sec=None):
+        self.lock = Lock()
+        self.files_per_sec = files_per_sec
+        self.bytes_per_sec = bytes_per_sec
+        self.files_allowed_at = 0
+        self.bytes_allowed_at = 0
+
+    def set_limits(self, files_per_sec=None, bytes_per_sec=None):
+        with self.lock:
+            self.files_per_sec = files_per_sec
+            self.bytes_per_sec = bytes_per_sec
+
+    def acquire(self, files=1, size=0, scale=1.0):
+        with self.lock:
+            now = time.monotonic()
+            start = now
+            if self.files_per_sec:
+                start = max(start, self.files_allowed_at)
+            if self.bytes_per_sec:
+                start = max(start, self.bytes_allowed_at)
+            if self.files_per_sec:
+                self.files_allowed_at = start + files / (self.files_per_sec * scale)
+            if self.bytes_per_sec:
+                self.bytes_allowed_at = start + size / (self.bytes_per_sec * scale)
+        if start > now:
+            time.sleep(start - now)
+
+
+class DeletionEngine:
+    # Deletes batches through a worker pool under a RateLimiter.
+    # The rate is scaled down when delete latency climbs above latency_target (the disk is busy)
+    # and recovers slowly once it drops again.
+
+    def __init__(self, max_workers=4, files_per_sec=None, bytes_per_sec=None, latency_target=0.05, min_scale=0.05):
+        self.max_workers = max(1, max_workers)
+        self.limiter = RateLimiter(files_per_sec, bytes_per_sec)
+        self.latency_target = latency_target
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self.latency = None
+        self.lock = Lock()
+        # Throughput seen while unthrottled, used as the ceiling when no files/sec limit is configured
+        self.window_start = time.monotonic()
+        self.window_files = 0
+        self.measured_files_per_sec = None
+        self.latency_observer = None  # Optional callable(latency) for metrics
+
+    def set_limits(self, files_per_sec=None, bytes_per_sec=None):
+        self.limiter.set_limits(files_per_sec, bytes_per_sec)
+
+    def observe(self, latency):
+        with self.lock:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if self.latency > self.latency_target:
+                self.scale = max(self.min_scale, self.scale * 0.7)
+            else:
+                self.scale = min(1.0, self.scale + 0.02)
+
+            self.window_files += 1
+            now = time.monotonic()
+            if now - self.window_start >= 1.0:
+                rate = self.window_files / (now - self.window_start)
+                if self.scale >= 1.0 or self.measured_files_per_sec is None:
+                    self.measured_files_per_sec = rate
+                self.window_start = now
+                self.window_files = 0
+
+    def throttle(self, size):
+        scale = self.scale
+        if self.limiter.files_per_sec or self.limiter.bytes_per_sec:
+            self.limiter.acquire(1, size, scale)
+        elif scale < 1.0 and self.measured_files_per_sec:
+            # No configured limit, so back off from the throughput the disk managed before it slowed down
+            time.sleep(1.0 / (self.measured_files_per_sec * scale) - 1.0 / self.measured_files_per_sec)
+
+    def delete_batch(self, records, delete_fn, is_cancelled=None):
+        # Returns the freed size per record, in input order.
+        # Once is_cancelled() is true the rest of the batch is skipped (freed size 0) without waiting on the limiter.
+        def delete_one(record):
+            if is_cancelled is not None and is_cancelled():
+                return 0
+            self.throttle(record.size)
+            if is_cancelled is not None and is_cancelled():
+                return 0  # Stopped while waiting for a slot
+            start_time = time.monotonic()
+            freed = delete_fn(record)
+            latency = time.monotonic() - start_time
+            self.observe(latency)
+            if self.latency_observer is not None:
+                self.latency_observer(latency)
+            return freed
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(delete_one, records))
+
+
+def batched(records, batch_size=500):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def directory_key(directory):
+    # Same spelling os.path.dirname gives for a child path, even if directory has a trailing separator
+    return os.path.dirname(os.path.join(directory, "_"))
+
+
+class DirectoryPruner:
+    # Remaining-child count per directory, filled from listings the deletion scan already made.
+    # Deleting a file decrements its folder; prune() then removes emptied folders bottom-up
+    # without listing any of them again.
+
+    def __init__(self):
+        self.lock = Lock()
+        self.counts = {}
+        self.parents = {}
+
+    def add_directory(self, directory, parent, child_count):
+        key = directory_key(directory)
+        with self.lock:
+            self.counts[key] = child_count
+            if parent is not None:
+                self.parents[key] = directory_key(parent)
+
+    def add_listing(self, directory, dir_records, file_records):
+        key = directory_key(directory)
+        with self.lock:
+            self.counts[key] = len(dir_records) + len(file_records)
+            for record in dir_records:
+                self.parents[record.path] = key
+
+    def removed(self, path):
+        key = os.path.dirname(path)
+        with self.lock:
+            if key in self.counts:
+                self.counts[key] -= 1
+
+    def prune(self, on_removed=None, on_error=None):
+        # Longest paths first, so every folder is handled after all of its subfolders.
+        # The scanned root has no parent entry and is never removed.
+        removed = 0
+        for directory in sorted(self.counts, key=len, reverse=True):
+            parent = self.parents.get(directory)
+            if parent is None or self.counts[directory] > 0:
+                continue
+            try:
+                os.rmdir(directory)  # Fails safely if something new appeared in the folder
+            except OSError as e:
+                if on_error is not None:
+                    on_error(e)
+                continue
+            removed += 1
+            if on_removed is not None:
+                on_removed(directory)
+            if parent in self.counts:
+                self.counts[parent] -= 1
+        return removed
+
+
+class ByteBudget:
+    # Freed-bytes accountant for a size target. Sizes come from the scan, and the real
+    # free space is only re-read every checkpoint_bytes of deletions.
+
+    def __init__(self, target_bytes, free_bytes, read_free_space, checkpoint_bytes=1024 ** 3):
+        self.lock = Lock()
+        self.target_bytes = target_bytes
+        self.free_bytes = free_bytes
+        self.read_free_space = read_free_space
+        self.checkpoint_bytes = checkpoint_bytes
+        self.freed = 0
+        self.freed_since_check = 0
+        self.checks = 0
+
+    def add(self, size):
+        with self.lock:
+            self.freed += size
+            self.freed_since_check += size
+
+    def expected_free(self):
+        return self.free_bytes + self.freed_since_check
+
+    def remaining(self):
+        return max(0, self.target_bytes - self.expected_free())
+
+    def checkpoint(self):
+        with self.lock:
+            self.free_bytes = self.read_free_space()
+            self.freed_since_check = 0
+            self.checks += 1
+        return self.free_bytes
+
+    def satisfied(self):
+        if self.checkpoint_bytes and self.freed_since_check >= self.checkpoint_bytes:
+            self.checkpoint()
+        return self.expected_free() >= self.target_bytes
+
+    def take(self, records):
+        # Cut a batch so it frees no more than the bytes still missing (plus the last file)
+        remaining = self.remaining()
+        taken = []
+        for record in records:
+            if remaining <= 0:
+                break
+            taken.append(record)
+            remaining -= record.size
+        return taken
@@ -0,0 +1,118 @@
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+
+from deleter import directory_key
+from scanner import list_directory
+
+# Aggregate of a whole subtree. oldest/newest_mtime are over its files, None for a subtree without files.
+SubtreeStats = namedtuple("SubtreeStats", ["path", "size", "files", "oldest_mtime", "newest_mtime"])
+
+
+def min_mtime(a, b):
+    return b if a is None else a if b is None else min(a, b)
+
+
+def max_mtime(a, b):
+    return b if a is None else a if b is None else max(a, b)
+
+
+class DirectorySizer:
+    # du-style sizing that lists folders in parallel, one pool task per folder.
+    # Each folder's own files are cached under the folder's mtime_ns, so on the next cycle an unchanged
+    # folder costs one stat instead of a listing. Adding, removing or renaming an entry changes the
+    # folder's mtime; a file rewritten in place does not, so its new size shows once its folder changes.
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max(1, max_workers)
+        self.lock = Lock()
+        self.cache = {}  # path -> (mtime_ns, size, files, oldest_mtime, newest_mtime, child paths)
+
+    def list_one(self, directory, on_error=None):
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with self.lock:
+                cached = self.cache.get(directory)
+            if cached is not None and cached[0] == mtime_ns:
+                return cached
+            dir_records, file_records = list_directory(directory, on_error)
+        except OSError as e:
+            if on_error is not None:
+                on_error(e)
+            return None
+
+        mtimes = [record.mtime for record in file_records]
+        entry = (mtime_ns, sum(record.size for record in file_records), len(file_records),
+                 min(mtimes) if mtimes else None, max(mtimes) if mtimes else None,
+                 [record.path for record in dir_records])
+        with self.lock:
+            self.cache[directory] = entry
+        return entry
+
+    def measure(self, directory, on_error=None, is_stopped=None):
+        # {path: SubtreeStats} for directory and every folder below it.
+        # Once is_stopped() is true no more folders are listed and the totals are partial; folders
+        # listed so far stay cached, so the next measure only stats them.
+        entries = {}
+        stopped = False
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(self.list_one, directory, on_error): directory}
+            while pending:
+                if is_stopped is not None and is_stopped():
+                    stopped = True
+                    for future in pending:
+                        future.cancel()  # Folders already being listed finish and stay cached
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    entry = future.result()
+                    if entry is None:
+                        continue
+                    entries[path] = entry
+                    for child in entry[5]:
+                        pending[executor.submit(self.list_one, child, on_error)] = child
+
+        # Children have longer paths than their parent, so this aggregates bottom-up
+        totals = {}
+        for path in sorted(entries, key=len, reverse=True):
+            _, size, files, oldest_mtime, newest_mtime, children = entries[path]
+            for child in children:
+                child_stats = totals.get(child)
+                if child_stats is None:
+                    continue
+                size += child_stats.size
+                files += child_stats.files
+                oldest_mtime = min_mtime(oldest_mtime, child_stats.oldest_mtime)
+                newest_mtime = max_mtime(newest_mtime, child_stats.newest_mtime)
+            totals[path] = SubtreeStats(path, size, files, oldest_mtime, newest_mtime)
+
+        if not stopped:
+            self.drop_unvisited(directory, entries)  # Unvisited only means deleted after a full walk
+        return totals
+
+    def size(self, directory, on_error=None):
+        stats = self.measure(directory, on_error).get(directory)
+        return stats.size if stats is not None else 0
+
+    def drop_unvisited(self, directory, visited):
+        # Folders deleted since the last cycle are no longer reached from directory; forget them
+        prefix = os.path.join(directory_key(directory), "")
+        with self.lock:
+            stale = [path for path in self.cache
+                     if path.startswith(prefix) and path not in visited]
+            for path in stale:
+                del self.cache[path]
+
+    def forget(self, directory):
+        # A target that was removed; its folders are not measured again
+        self.drop_unvisited(directory, ())
+        with self.lock:
+            self.cache.pop(directory_key(directory), None)
+            self.cache.pop(directory, None)
+
+    def child_folders(self, directory, totals):
+        # The SubtreeStats of directory's direct subfolders, from a measure(directory) result
+        key = directory_key(directory)
+        return [stats for path, stats in totals.items() if path != directory and os.path.dirname(path) == key]
@@ -0,0 +1,205 @@
+import os
+import sqlite3
+import threading
+import time
+
+from scanner import FileRecord, list_directory
+
+# Rows fetched per query page, so deletions can run between pages without holding a cursor open
+PAGE_SIZE = 1000
+# refresh() commits after this many folder listings or seconds, so SQLite's single write lock is held
+# briefly and other drives' refreshes interleave with a long first build instead of timing out
+COMMIT_LISTINGS = 200
+COMMIT_SECONDS = 1.0
+
+
+class FileIndex:
+    # On-disk (path, size, mtime) index per target directory.
+    # refresh() only re-lists directories whose own mtime changed since the last cycle.
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.local = threading.local()
+        self.connections = []  # (thread, connection)
+        self.connections_lock = threading.Lock()
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                root TEXT NOT NULL,
+                path TEXT NOT NULL,
+                parent TEXT,
+                mtime_ns INTEGER,
+                PRIMARY KEY (root, path)
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                root TEXT NOT NULL,
+                path TEXT NOT NULL,
+                dir TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                PRIMARY KEY (root, path)
+            );
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (root, parent);
+            CREATE INDEX IF NOT EXISTS files_dir ON files (root, dir);
+            CREATE INDEX IF NOT EXISTS files_mtime ON files (root, mtime, path);
+        """)
+
+    @property
+    def connection(self):
+        # One connection per thread, so targets on different drives can read concurrently.
+        # DriveScheduler starts new worker threads every cycle; connections of threads that have
+        # ended are closed here, so open connections stay bounded by the live threads.
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.index_path, timeout=60, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+            with self.connections_lock:
+                live = []
+                for thread, other in self.connections:
+                    if thread.is_alive():
+                        live.append((thread, other))
+                    else:
+                        other.close()
+                live.append((threading.current_thread(), connection))
+                self.connections = live
+        return connection
+
+    def close(self):
+        with self.connections_lock:
+            for _, connection in self.connections:
+                connection.close()
+            self.connections.clear()
+        self.local = threading.local()
+
+    def refresh(self, root, on_error=None, is_stopped=None):
+        # Walk directories only; unchanged ones reuse their stored listing.
+        # Every stored listing is complete on its own, so committing part of the walk leaves a
+        # consistent index; folders not reached yet keep their old or placeholder rows. A walk cut
+        # short by is_stopped() therefore resumes on the next refresh: what it stored is unchanged.
+        relisted = 0
+        uncommitted = 0
+        last_commit = time.monotonic()
+        connection = self.connection
+        cursor = connection.cursor()
+        stack = [(root, None)]
+        try:
+            while stack:
+                if is_stopped is not None and is_stopped():
+                    break
+                path, parent = stack.pop()
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError:
+                    self._forget_subtree(cursor, root, path)
+                    continue
+
+                row = cursor.execute(
+                    "SELECT mtime_ns FROM dirs WHERE root = ? AND path = ?", (root, path)).fetchone()
+                if row is not None and row[0] == mtime_ns:
+                    subdirs = [r[0] for r in cursor.execute(
+                        "SELECT path FROM dirs WHERE root = ? AND parent = ?", (root, path))]
+                else:
+                    try:
+                        dir_records, file_records = list_directory(path, on_error)
+                    except OSError as e:
+                        if on_error is not None:
+                            on_error(e)
+                        continue
+                    subdirs = self._store_listing(cursor, root, path, parent, mtime_ns, dir_records, file_records)
+                    relisted += 1
+                    uncommitted += 1
+                    if uncommitted >= COMMIT_LISTINGS or time.monotonic() - last_commit >= COMMIT_SECONDS:
+                        connection.commit()
+                        uncommitted = 0
+                        last_commit = time.monotonic()
+
+                stack.extend((subdir, path) for subdir in subdirs)
+            connection.commit()
+        except BaseException:
+            connection.rollback()  # Only the listings since the last commit
+            raise
+        return relisted
+
+    def _store_listing(self, cursor, root, path, parent, mtime_ns, dir_records, file_records):
+        cursor.execute("DELETE FROM files WHERE root = ? AND dir = ?", (root, path))
+        cursor.executemany(
+            "INSERT OR REPLACE INTO files (root, path, dir, size, mtime) VALUES (?, ?, ?, ?, ?)",
+            [(root, record.path, path, record.size, record.mtime) for record in file_records])
+
+        # Subdirectories that disappeared take their whole indexed subtree with them
+        subdirs = [record.path for record in dir_records]
+        known = {r[0] for r in cursor.execute(
+            "SELECT path FROM dirs WHERE root = ? AND parent = ?", (root, path))}
+        for removed in known.difference(subdirs):
+            self._forget_subtree(cursor, root, removed)
+
+        cursor.execute(
+            "INSERT OR REPLACE INTO dirs (root, path, parent, mtime_ns) VALUES (?, ?, ?, ?)",
+            (root, path, parent, mtime_ns))
+        # New subdirectories get a placeholder row so they are listed on this pass
+        cursor.executemany(
+            "INSERT OR IGNORE INTO dirs (root, path, parent, mtime_ns) VALUES (?, ?, ?, NULL)",
+            [(root, subdir, path) for subdir in subdirs])
+        return subdirs
+
+    def _forget_subtree(self, cursor, root, path):
+        # Range query on the path prefix, which avoids LIKE escaping for '%' and '_' in names
+        low = path + os.sep
+        high = path + chr(ord(os.sep) + 1)
+        cursor.execute("DELETE FROM files WHERE root = ? AND (dir = ? OR (dir >= ? AND dir < ?))",
+                       (root, path, low, high))
+        cursor.execute("DELETE FROM dirs WHERE root = ? AND (path = ? OR (path >= ? AND path < ?))",
+                       (root, path, low, high))
+
+    def forget_root(self, root):
+        connection = self.connection
+        with connection:
+            connection.execute("DELETE FROM files WHERE root = ?", (root,))
+            connection.execute("DELETE FROM dirs WHERE root = ?", (root,))
+
+    def directory_counts(self, root):
+        # (path, parent, child count) for every indexed folder, for pruning without re-listing
+        return self.connection.execute(
+            "SELECT d.path, d.parent, "
+            "(SELECT COUNT(*) FROM files f WHERE f.root = d.root AND f.dir = d.path) + "
+            "(SELECT COUNT(*) FROM dirs c WHERE c.root = d.root AND c.parent = d.path) "
+            "FROM dirs d WHERE d.root = ?", (root,)).fetchall()
+
+    def oldest_files(self, root, before_mtime=None):
+        # Range lookup ordered by mtime, paged with a (mtime, path) keyset
+        last_mtime = float("-inf")
+        last_path = ""
+        limit = float("inf") if before_mtime is None else before_mtime
+        while True:
+            rows = self.connection.execute(
+                "SELECT path, size, mtime FROM files "
+                "WHERE root = ? AND mtime < ? AND (mtime > ? OR (mtime = ? AND path > ?)) "
+                "ORDER BY mtime, path LIMIT ?",
+                (root, limit, last_mtime, last_mtime, last_path, PAGE_SIZE)).fetchall()
+            if not rows:
+                return
+            for path, size, mtime in rows:
+                record = self._verify(root, path, size, mtime)
+                if record is not None:
+                    yield record
+            last_path, _, last_mtime = rows[-1]
+
+    def files_older_than(self, root, cutoff_mtime):
+        return self.oldest_files(root, before_mtime=cutoff_mtime)
+
+    def _verify(self, root, path, size, mtime):
+        # Files rewritten in place do not change their directory's mtime, so re-check each candidate
+        try:
+            stat = os.lstat(path)
+        except OSError:
+            with self.connection as connection:
+                connection.execute("DELETE FROM files WHERE root = ? AND path = ?", (root, path))
+            return None
+        if stat.st_size != size or stat.st_mtime != mtime:
+            # Re-filed under its new mtime; skip it on this pass instead of deleting a changed file
+            with self.connection as connection:
+                connection.execute(
+                    "UPDATE files SET size = ?, mtime = ? WHERE root = ? AND path = ?",
+                    (stat.st_size, stat.st_mtime, root, path))
+            return None
+        return FileRecord(path, size, mtime, False)
@@ -0,0 +1,160 @@
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import time
+from datetime import datetime
+
+
+class RotatingLogFileHandler(logging.Handler):
+    # Writes to <prefix>_<YYYYMMDD><extension>, starting a new file every day. A file that grows past
+    # max_bytes is rolled to <prefix>_<YYYYMMDD>_<HHMMSSffffff><extension>, gzipped when compress is set.
+    # backup_count > 0 keeps only that many rolled files; 0 keeps everything.
+
+    def __init__(self, log_folder, prefix, extension, max_bytes=50 * 1024 ** 2, backup_count=0, compress=False):
+        super().__init__()
+        self.log_folder = log_folder
+        self.prefix = prefix
+        self.extension = extension
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.day = None
+        self.stream = None
+        self.size = 0
+        os.makedirs(log_folder, exist_ok=True)
+
+    def current_path(self):
+        return os.path.join(self.log_folder, f"{self.prefix}_{self.day}{self.extension}")
+
+    def open_stream(self, day):
+        if self.stream is not None:
+            self.stream.close()
+        self.day = day
+        self.stream = open(self.current_path(), "a", encoding="utf-8")
+        self.size = self.stream.tell()
+
+    def roll_over(self):
+        self.stream.close()
+        self.stream = None
+        source = self.current_path()
+        rolled = os.path.join(self.log_folder, f"{self.prefix}_{self.day}_{datetime.now():%H%M%S%f}{self.extension}")
+        os.replace(source, rolled)
+        if self.compress:
+            self.compress_file(rolled)
+        self.remove_old_files()
+        self.open_stream(self.day)
+
+    def compress_file(self, path):
+        with open(path, "rb") as source_file, gzip.open(path + ".gz", "wb") as compressed_file:
+            shutil.copyfileobj(source_file, compressed_file)
+        os.remove(path)
+
+    def remove_old_files(self):
+        if self.backup_count <= 0:
+            return
+        rolled = sorted(name for name in os.listdir(self.log_folder)
+                        if name.startswith(self.prefix + "_") and name.count("_") >= 2)
+        for name in rolled[:-self.backup_count]:
+            try:
+                os.remove(os.path.join(self.log_folder, name))
+            except OSError:
+                pass
+
+    def emit(self, record):
+        try:
+            day = datetime.fromtimestamp(record.created).strftime("%Y%m%d")
+            if self.stream is None or day != self.day:
+                previous_path = self.current_path() if self.stream is not None else None
+                self.open_stream(day)
+                if previous_path is not None and self.compress:
+                    self.compress_file(previous_path)  # Yesterday's file is complete
+            line = self.format(record) + "\n"
+            self.stream.write(line)
+            self.size += len(line)
+            if self.max_bytes and self.size >= self.max_bytes:
+                self.roll_over()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        super().close()
+
+
+class DeletionRecordFormatter(logging.Formatter):
+    def format(self, record):
+        return json.dumps({"time": datetime.fromtimestamp(record.created).isoformat(),
+                           "path": record.path, "size": record.size, "mtime": record.mtime, "rule": record.rule})
+
+
+class FileLogger:
+    # Background logging sink. Callers only put records on a queue; a QueueListener thread
+    # does the file writes, so neither the UI nor the monitoring thread waits on the disk.
+    #   AutodeleteLog_<date>.txt        - the log messages shown in the UI
+    #   AutodeleteAudit_<date>.jsonl    - one record per deleted file (timestamp, path, size, mtime, rule)
+
+    def __init__(self, log_folder, max_bytes=50 * 1024 ** 2, backup_count=0, compress=True):
+        self.log_folder = log_folder
+        self.queue = queue.SimpleQueue()
+
+        self.message_logger = self.make_logger("autodelete.log")
+        self.audit_logger = self.make_logger("autodelete.audit")
+
+        message_handler = RotatingLogFileHandler(log_folder, "AutodeleteLog", ".txt", max_bytes, backup_count, compress)
+        message_handler.addFilter(logging.Filter("autodelete.log"))
+        message_handler.setFormatter(logging.Formatter("%(message)s"))
+        audit_handler = RotatingLogFileHandler(log_folder, "AutodeleteAudit", ".jsonl", max_bytes, backup_count, compress)
+        audit_handler.addFilter(logging.Filter("autodelete.audit"))
+        audit_handler.setFormatter(DeletionRecordFormatter())
+
+        self.handlers = [message_handler, audit_handler]
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers)
+        self.listener.start()
+
+    def make_logger(self, name):
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.handlers = [logging.handlers.QueueHandler(self.queue)]
+        return logger
+
+    def log_lines(self, lines):
+        for line in lines:
+            self.message_logger.info(line)
+
+    def log_deletion(self, path, size, mtime, rule):
+        self.audit_logger.info("deleted", extra={"path": path, "size": size, "mtime": mtime, "rule": rule})
+
+    def message_log_path(self):
+        return os.path.join(self.log_folder, f"AutodeleteLog_{datetime.now():%Y%m%d}.txt")
+
+    def flush(self, timeout=5):
+        # Waits until the listener has written everything queued so far
+        deadline = time.monotonic() + timeout
+        while not self.queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for handler in self.handlers:
+            handler.acquire()
+            try:
+                handler.flush()
+            finally:
+                handler.release()
+
+    def close(self):
+        # Safe to call twice (quit_app and atexit)
+        if self.listener is None:
+            return
+        self.listener.stop()
+        self.listener = None
+        for handler in self.handlers:
+            handler.close()
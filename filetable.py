@@ -0,0 +1,134 @@
+import os
+from array import array
+from functools import lru_cache
+
+from scanner import FileRecord
+
+# Columnar store for the size rule's candidates: per row a folder id, the file name in one shared
+# bytes buffer, and size/mtime in typed arrays, about 40 bytes plus the name per file instead of a
+# tuple of Python objects. Folder paths are interned once.
+
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    # Imported on first use, not with monitor: it doubles the CLI's start-up time
+    try:
+        import numpy
+        return numpy
+    except ImportError:  # Optional; the same selection runs in pure Python, only slower
+        return None
+
+
+class FileTable:
+    def __init__(self):
+        self.folders = []
+        self.folder_ids = {}
+        self.parents = array("I")
+        self.names = bytearray()
+        self.name_ends = array("Q")
+        self.sizes = array("q")
+        self.mtimes = array("d")
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def __iter__(self):
+        return self.records(range(len(self)))
+
+    def add(self, record):
+        folder, name = os.path.split(record.path)
+        folder_id = self.folder_ids.get(folder)
+        if folder_id is None:
+            folder_id = self.folder_ids[folder] = len(self.folders)
+            self.folders.append(folder)
+        self.parents.append(folder_id)
+        self.names += os.fsencode(name)
+        self.name_ends.append(len(self.names))
+        self.sizes.append(record.size)
+        self.mtimes.append(record.mtime)
+
+    def name(self, row):
+        start = self.name_ends[row - 1] if row else 0
+        return os.fsdecode(bytes(self.names[start:self.name_ends[row]]))
+
+    def record(self, row):
+        return FileRecord(os.path.join(self.folders[self.parents[row]], self.name(row)), self.sizes[row],
+                          self.mtimes[row], False)
+
+    def records(self, rows):
+        for row in rows:
+            yield self.record(row)
+
+    def total_size(self):
+        numpy = load_numpy() if self.sizes else None
+        if numpy is not None:
+            return int(numpy.frombuffer(self.sizes, dtype=numpy.int64).sum())
+        return sum(self.sizes)
+
+    def oldest_rows(self, bytes_needed):
+        # Rows sorted oldest first, cut after the first row that brings the total to bytes_needed
+        if not self.sizes:
+            return range(0)
+        numpy = load_numpy()
+        if numpy is not None:
+            mtimes = numpy.frombuffer(self.mtimes, dtype=numpy.float64)
+            sizes = numpy.frombuffer(self.sizes, dtype=numpy.int64)
+            order = numpy.argsort(mtimes, kind="stable")
+            covered = numpy.searchsorted(numpy.cumsum(sizes[order]), bytes_needed)
+            return order[:covered + 1]
+
+        order = sorted(range(len(self.sizes)), key=self.mtimes.__getitem__)
+        total_size = 0
+        for count, row in enumerate(order, 1):
+            total_size += self.sizes[row]
+            if total_size >= bytes_needed:
+                return order[:count]
+        return order
+
+    def keep_rows(self, rows):
+        # Rebuilds the columns with only rows, in that order. Folders stay interned.
+        names = bytearray()
+        name_ends = array("Q")
+        for row in rows:
+            start = self.name_ends[row - 1] if row else 0
+            names += self.names[start:self.name_ends[row]]
+            name_ends.append(len(names))
+        numpy = load_numpy()
+        if numpy is not None:
+            rows = numpy.asarray(rows, dtype=numpy.intp)
+            self.parents = array("I", numpy.frombuffer(self.parents, dtype=numpy.uint32)[rows].tobytes())
+            self.sizes = array("q", numpy.frombuffer(self.sizes, dtype=numpy.int64)[rows].tobytes())
+            self.mtimes = array("d", numpy.frombuffer(self.mtimes, dtype=numpy.float64)[rows].tobytes())
+        else:
+            self.parents = array("I", [self.parents[row] for row in rows])
+            self.sizes = array("q", [self.sizes[row] for row in rows])
+            self.mtimes = array("d", [self.mtimes[row] for row in rows])
+        self.names = names
+        self.name_ends = name_ends
+
+    def keep_oldest(self, bytes_needed):
+        # Drops every row that cannot be part of the selection; the table is then sorted oldest first
+        self.keep_rows(self.oldest_rows(bytes_needed))
+
+
+def select_oldest_table(records, bytes_needed, chunk_rows=65536):
+    # The oldest files whose sizes add up to bytes_needed, returned as a FileTable in oldest-first order.
+    # The table is cut back to the rows that still cover bytes_needed whenever it doubles, so memory
+    # stays bounded by the selection, and once the deficit is covered newer files are never stored.
+    table = FileTable()
+    if bytes_needed <= 0:
+        return table
+
+    limit = chunk_rows
+    newest_kept = None  # mtime at or above which a file cannot be selected
+    for record in records:
+        if record.is_dir or (newest_kept is not None and record.mtime >= newest_kept):
+            continue
+        table.add(record)
+        if len(table) >= limit:
+            table.keep_oldest(bytes_needed)
+            if table.total_size() >= bytes_needed:
+                newest_kept = table.mtimes[-1]
+            limit = max(chunk_rows, 2 * len(table))
+    table.keep_oldest(bytes_needed)
+    return table
@@ -0,0 +1,87 @@
+import time
+
+import psutil
+
+
+class FillRateEstimator:
+    # Smoothed rate at which each drive's free space is consumed, in bytes/sec (negative while it grows)
+    def __init__(self, smoothing=0.3):
+        self.smoothing = smoothing
+        self.samples = {}  # drive -> (time, free bytes)
+        self.rates = {}
+
+    def sample(self, drive, free_bytes, now=None, update_rate=True):
+        # update_rate=False only moves the baseline, e.g. right after a cleanup freed space
+        now = time.monotonic() if now is None else now
+        previous = self.samples.get(drive)
+        if update_rate and previous is not None and now > previous[0]:
+            rate = (previous[1] - free_bytes) / (now - previous[0])
+            old_rate = self.rates.get(drive)
+            self.rates[drive] = rate if old_rate is None else old_rate + self.smoothing * (rate - old_rate)
+        self.samples[drive] = (now, free_bytes)
+
+    def seconds_until(self, drive, target_bytes):
+        # Predicted seconds until free space drops to target_bytes; None if it is not dropping
+        sample = self.samples.get(drive)
+        rate = self.rates.get(drive)
+        if sample is None:
+            return None
+        if sample[1] <= target_bytes:
+            return 0
+        if not rate or rate <= 0:
+            return None
+        return (sample[1] - target_bytes) / rate
+
+
+class AdaptiveInterval:
+    # Plans the wait between cycles from the size targets' fill rates. The next cycle is due after
+    # safety x the predicted time until the first drive reaches its target, within [min, max] seconds.
+    # Idle drives stretch the wait to max_seconds, busy ones pull it in towards min_seconds.
+
+    def __init__(self, target_list, min_seconds=60, max_seconds=4 * 60 * 60, safety=0.5, sample_seconds=30,
+                 read_free_space=None):
+        self.set_targets(target_list)
+        self.min_seconds = min_seconds
+        self.max_seconds = max(min_seconds, max_seconds)
+        self.safety = safety
+        self.sample_seconds = sample_seconds
+        self.read_free_space = read_free_space or (lambda drive: psutil.disk_usage(drive).free)
+        self.estimator = FillRateEstimator()
+        self.last_sample = None
+
+    def set_targets(self, target_list):
+        # Only size targets have a free-space threshold to predict
+        self.targets = [(target[0], target[2] * (1024 ** 3)) for target in target_list
+                        if target[0] is not None and target[2] is not None]
+
+    def sample(self, update_rate=True):
+        now = time.monotonic()
+        for drive in {drive for drive, _ in self.targets}:
+            try:
+                self.estimator.sample(drive, self.read_free_space(drive), now, update_rate)
+            except OSError:
+                continue
+        self.last_sample = now
+
+    def restart(self):
+        # After a cycle: the cleanup's own deletions must not count as a negative fill rate
+        self.sample(update_rate=False)
+
+    def due(self):
+        return self.last_sample is None or time.monotonic() - self.last_sample >= self.sample_seconds
+
+    def next_interval(self, nominal_seconds):
+        # Seconds until the next cycle should start; nominal_seconds when no size target is at risk
+        # but a drive is already below target (the last cycle could not free more)
+        if not self.targets:
+            return self.max_seconds
+        planned = self.max_seconds
+        for drive, target_bytes in self.targets:
+            seconds = self.estimator.seconds_until(drive, target_bytes)
+            if seconds is None:
+                continue
+            if seconds == 0:
+                planned = min(planned, nominal_seconds)
+            else:
+                planned = min(planned, seconds * self.safety)
+        return int(max(self.min_seconds, min(self.max_seconds, planned)))
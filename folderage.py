@@ -0,0 +1,65 @@
+import os
+import re
+from datetime import datetime, timedelta
+
+from scanner import walk_records
+
+# Directory-granular age rules. A folder whose name holds a date (20240131, 2024-01-31, 2024_01_31,
+# 2024.01.31) is as old as the end of that day and is decided without being listed. Any other folder
+# is expired when nothing in its subtree is newer than the cutoff, and is then removed as one unit.
+
+DATE_PATTERN = re.compile(r"(?<!\d)((?:19|20)\d\d)([-_.]?)(0[1-9]|1[0-2])\2(0[1-9]|[12]\d|3[01])(?!\d)")
+
+
+def folder_date_end(name):
+    # Timestamp of the end of the day named in a folder name, or None
+    match = DATE_PATTERN.search(name)
+    if match is None:
+        return None
+    try:
+        day = datetime(int(match.group(1)), int(match.group(3)), int(match.group(4)))
+    except ValueError:
+        return None
+    return (day + timedelta(days=1)).timestamp()
+
+
+def subtree_expired(directory, cutoff_mtime, on_error=None):
+    # (True, total size) when no file or folder below directory is newer than cutoff_mtime.
+    # Stops listing at the first newer entry and returns (False, None).
+    total_size = 0
+    for _, dir_records, file_records in walk_records(directory, on_error):
+        for record in dir_records:
+            if record.mtime > cutoff_mtime:
+                return False, None
+        for record in file_records:
+            if record.mtime > cutoff_mtime:
+                return False, None
+            total_size += record.size
+    return True, total_size
+
+
+def expired_entries(directory, cutoff_mtime, on_error=None, on_listing=None):
+    # Yields FileRecords to delete: whole expired subtrees (is_dir, size of the subtree or 0 when the
+    # folder was judged by its name) and loose expired files in the folders that are kept.
+    # Only folders holding both old and new data are descended into.
+    for root, dir_records, file_records in walk_records(directory, on_error):
+        if on_listing is not None:
+            on_listing(root, dir_records, file_records)
+        for record in file_records:
+            if record.mtime <= cutoff_mtime:
+                yield record
+
+        mixed = []
+        for record in dir_records:
+            day_end = folder_date_end(os.path.basename(record.path))
+            if day_end is not None:
+                if day_end <= cutoff_mtime:
+                    yield record
+                continue  # A dated folder is kept or removed as a whole
+            if record.mtime <= cutoff_mtime:
+                expired, size = subtree_expired(record.path, cutoff_mtime, on_error)
+                if expired:
+                    yield record._replace(size=size)
+                    continue
+            mixed.append(record)
+        dir_records[:] = mixed
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+# File-based leases that let several cleaners share one volume. A lease is a small JSON file in a
+# folder every cleaner can reach (e.g. on the same NAS); holding it means "I am cleaning this part".
+#   - every acquisition creates a new generation file "<name>.<generation>.lease" with O_EXCL, so of
+#     any number of cleaners racing for a free or expired lease exactly one wins; the winner removes
+#     the generation it replaced
+#   - kept alive by a heartbeat that touches the file every ttl/3; a cleaner that died stops touching
+#     it and the lease expires ttl seconds after its mtime, then anyone may take it over
+#   - released as "done", which keeps others away for done_hold seconds so a part cleaned a moment
+#     ago is not walked again by the next cleaner in the same round
+# Expiry compares the file's mtime with the local clock, so ttl must exceed the clock skew between
+# stations.
+
+LEASE_SUFFIX = ".lease"
+
+
+def default_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def share_key(share):
+    # The Shared column is the same label on every station, however each one mounts the share
+    return share.strip().replace("\\", "/").rstrip("/").casefold()
+
+
+class LeaseManager:
+    def __init__(self, folder, owner=None, ttl=300, done_hold=600):
+        self.folder = folder
+        self.owner = owner or default_owner()
+        self.ttl = ttl
+        self.done_hold = done_hold
+        self.lock = threading.Lock()
+        self.held = {}  # name -> generation this cleaner created
+        self.generations = {}  # name -> last generation seen, where probing starts
+        self.stop_event = threading.Event()
+        self.thread = None
+        os.makedirs(folder, exist_ok=True)
+
+    def name(self, share, rule, part="."):
+        key = "|".join((share_key(share), rule, part))
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def path(self, name, generation):
+        return os.path.join(self.folder, f"{name}.{generation}{LEASE_SUFFIX}")
+
+    def content(self, state, hold):
+        return json.dumps({"owner": self.owner, "state": state, "hold": hold, "time": time.time()})
+
+    def current(self, name):
+        # Newest generation of a lease, or None when it was never taken. Generations only grow, so
+        # the last one seen and the next are tried before listing the folder.
+        generation = self.generations.get(name, 0)
+        for candidate in (generation, generation + 1):
+            if os.path.exists(self.path(name, candidate)):
+                if not os.path.exists(self.path(name, candidate + 1)):
+                    self.generations[name] = candidate
+                    return candidate
+        found = self.listed(name)
+        if not found:
+            return None
+        self.generations[name] = max(found)
+        return self.generations[name]
+
+    def listed(self, name):
+        prefix = name + "."
+        found = []
+        for entry in os.listdir(self.folder):
+            generation = entry[len(prefix):-len(LEASE_SUFFIX)]
+            if entry.startswith(prefix) and entry.endswith(LEASE_SUFFIX) and generation.isdigit():
+                found.append(int(generation))
+        return found
+
+    def read(self, name, generation):
+        # (owner, state, hold, mtime), or None when the generation is gone
+        path = self.path(name, generation)
+        try:
+            mtime = os.stat(path).st_mtime
+            with open(path, "r", encoding="utf-8") as lease_file:
+                data = json.load(lease_file)
+            return data.get("owner"), data.get("state"), data.get("hold", self.ttl), mtime
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Being written by its creator right now; count it as freshly held
+            return None, "held", self.ttl, time.time()
+
+    def write(self, name, generation, state, hold):
+        # Only on a generation this cleaner created
+        temp_path = f"{self.path(name, generation)}.{self.owner.replace(':', '_')}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as lease_file:
+            lease_file.write(self.content(state, hold))
+        os.replace(temp_path, self.path(name, generation))
+
+    def acquire(self, name):
+        # True when this cleaner now holds the lease. Raises OSError when the lease folder is unusable.
+        generation = self.current(name)
+        if generation is None:
+            generation = 0
+        else:
+            lease = self.read(name, generation)
+            if lease is not None:
+                owner, state, hold, mtime = lease
+                if owner != self.owner and time.time() < mtime + hold:
+                    return False  # Held by another cleaner, or done a moment ago
+            generation += 1
+        try:
+            with open(self.path(name, generation), "x", encoding="utf-8") as lease_file:
+                lease_file.write(self.content("held", self.ttl))
+        except FileExistsError:
+            return False  # Another cleaner took it first
+        if max(self.listed(name)) > generation:
+            # Created after newer takeovers had removed this generation; the newest one is the lease
+            os.remove(self.path(name, generation))
+            return False
+        self.generations[name] = generation
+        if generation:
+            try:
+                os.remove(self.path(name, generation - 1))
+            except FileNotFoundError:
+                pass
+        with self.lock:
+            self.held[name] = generation
+        return True
+
+    def release(self, name, done=True):
+        # done: the part was cleaned, keep it for done_hold seconds; otherwise free it right away
+        with self.lock:
+            generation = self.held.pop(name, None)
+        if generation is None or not os.path.exists(self.path(name, generation)):
+            return  # Taken over after it expired
+        self.write(name, generation, "done" if done else "free", self.done_hold if done else 0)
+
+    def renew(self):
+        # Heartbeat: touch every lease still held; a generation removed by a takeover is dropped
+        with self.lock:
+            held = list(self.held.items())
+        for name, generation in held:
+            try:
+                os.utime(self.path(name, generation))
+            except FileNotFoundError:
+                with self.lock:
+                    if self.held.get(name) == generation:
+                        del self.held[name]
+            except OSError:
+                pass
+
+    def start(self):
+        self.thread = threading.Thread(target=self.heartbeat, name="lease-heartbeat", daemon=True)
+        self.thread.start()
+
+    def heartbeat(self):
+        while not self.stop_event.wait(self.ttl / 3):
+            self.renew()
+
+    def spread(self, parts):
+        # Each cleaner starts at a different part, so cooperating cleaners rarely race for the same lease
+        if not parts:
+            return parts
+        start = int(hashlib.sha1(self.owner.encode("utf-8")).hexdigest(), 16) % len(parts)
+        return parts[start:] + parts[:start]
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        with self.lock:
+            held = list(self.held)
+        for name in held:
+            self.release(name, done=False)
@@ -0,0 +1,53 @@
+import time
+from collections import deque
+from datetime import datetime
+from threading import Lock
+
+
+class LogRingBuffer:
+    # Fixed-capacity queue of the lines the view has not shown yet; the view keeps its own history.
+    # Bounded, so a burst of messages can never grow memory or the widget.
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.pending = deque(maxlen=capacity)
+
+    def extend(self, lines):
+        self.pending.extend(lines)
+
+    def take_pending(self):
+        lines = list(self.pending)
+        self.pending.clear()
+        return lines
+
+    def clear(self):
+        self.pending.clear()
+
+
+class LogBatcher:
+    # Collects log messages from worker threads and publishes them as lists,
+    # at most once per interval. flush() publishes whatever is left.
+
+    def __init__(self, publish, interval=0.1):
+        self.publish = publish
+        self.interval = interval
+        self.lock = Lock()
+        self.pending = []
+        self.last_publish = 0
+
+    def add(self, message):
+        # Timestamped here, so batching does not shift the time shown in the log
+        line = f"[{datetime.now()}] {message}"
+        with self.lock:
+            self.pending.append(line)
+            due = time.monotonic() - self.last_publish >= self.interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            batch = self.pending
+            self.pending = []
+            self.last_publish = time.monotonic()
+        if batch:
+            self.publish(batch)
@@ -0,0 +1,170 @@
+import os
+import threading
+
+import scanner
+
+# Prometheus text exposition format, without the prometheus_client dependency.
+# Labels are passed as a tuple of values in the order of the metric's label names.
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def escape_label(value):
+    return ("" if value is None else str(value)).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        with self.lock:
+            values = sorted(self.values.items())
+        return self.header() + [f"{self.name}{format_labels(self.label_names, labels)} {value}"
+                                for labels, value in values]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, labels=()):
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        with self.lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = [[0] * len(self.buckets), 0, 0]
+            bucket_counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bucket_counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self.lock:
+            values = sorted((labels, (list(series[0]), series[1], series[2])) for labels, series in self.values.items())
+        lines = self.header()
+        for labels, (bucket_counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{format_labels(self.label_names, labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MonitorMetrics:
+    # The metrics MonitoringCore records. When metrics are disabled the core holds None
+    # instead and every call site is skipped by a single attribute check.
+
+    def __init__(self, metrics_path=None):
+        self.metrics_path = metrics_path
+        self.export_lock = threading.Lock()  # Drive workers finishing together share one temp file
+        self.registry = MetricsRegistry()
+        add = self.registry.add
+        self.target_seconds = add(Histogram("autodelete_target_seconds", "Time to process one target.", ["directory"]))
+        self.scan_seconds = add(Histogram("autodelete_scan_seconds",
+                                          "Time to scan or refresh the index for a target.", ["directory"]))
+        self.stat_calls = add(Counter("autodelete_stat_calls_total", "Directory entries stat'ed by scans."))
+        self.files_deleted = add(Counter("autodelete_files_deleted_total", "Files deleted.", ["directory", "rule"]))
+        self.bytes_deleted = add(Counter("autodelete_bytes_deleted_total", "Bytes freed by deletions.",
+                                         ["directory", "rule"]))
+        self.delete_seconds = add(Histogram("autodelete_delete_seconds", "Latency of a single delete call."))
+        self.errors = add(Counter("autodelete_errors_total", "Errors by exception type.", ["type"]))
+        self.free_bytes = add(Gauge("autodelete_free_bytes", "Free space last read on a drive.", ["drive"]))
+        self.target_free_bytes = add(Gauge("autodelete_target_free_bytes", "Free space a size target asks for.",
+                                           ["drive", "directory"]))
+        self.cycles = add(Counter("autodelete_cycles_total", "Completed monitoring cycles."))
+
+        scanner.stat_counter = lambda count: self.stat_calls.inc(amount=count)
+
+    def export(self):
+        # Written to a temporary file and renamed, so a collector never reads half a file
+        if self.metrics_path is None:
+            return
+        temp_path = self.metrics_path + ".tmp"
+        with self.export_lock:
+            with open(temp_path, "w", encoding="utf-8") as metrics_file:
+                metrics_file.write(self.registry.render())
+            os.replace(temp_path, self.metrics_path)
+
+    def close(self):
+        scanner.stat_counter = None
+
+
+def serve_metrics(registry, port, host="127.0.0.1"):
+    # Serves registry.render() on http://host:port/metrics from a daemon thread; returns the server.
+    # http.server is imported here, not with the module, so start-up does not pay for it unless served.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
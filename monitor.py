@@ -0,0 +1,1115 @@
+import csv
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import psutil
+
+import scanner
+from scanner import FileRecord, list_directory, scan_directory, walk_records
+from dirsize import DirectorySizer
+from folderage import expired_entries
+from itertools import takewhile
+
+from selection import take_oldest
+from filetable import FileTable, select_oldest_table
+from scheduler import DriveScheduler, drive_key
+from deleter import SLOW_MODE_FILES_PER_SEC, ByteBudget, DeletionEngine, DirectoryPruner, batched
+from planner import PlanWriter, estimate_seconds, read_plan
+from progress import ProgressReporter
+from fillrate import AdaptiveInterval
+from rules import compile_filter
+
+# Nothing in this module imports Qt, so the headless CLI starts without loading PyQt5
+
+TARGET_CSV_PATH = "D:/Program/RVS/Autodelete/targetlist.csv"
+INDEX_PATH = "D:/Program/RVS/Autodelete/fileindex.db"
+METRICS_PATH = "D:/Program/RVS/Autodelete/autodelete.prom"
+RESUME_PATH = "D:/Program/RVS/Autodelete/Resume"
+
+# With the adaptive interval an idle station may wait up to this many monitoring intervals
+ADAPTIVE_MAX_INTERVAL_FACTOR = 4
+
+# Define a global variable for slow_mode
+global_slow_mode = True
+
+
+class BoundSignal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def emit(self, *args):
+        for slot in self.slots:
+            slot(*args)
+
+
+class Signal:
+    # Qt-free stand-in for pyqtSignal: declared on the class, bound per instance on first access
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        bound = BoundSignal()
+        instance.__dict__[self.name] = bound
+        return bound
+
+
+# One row of the target list. age_mode "files" ages every file on its own mtime; "folders" removes
+# whole subfolders once they are older than period_days (see folderage.py).
+# include/exclude/min_size_mb/max_size_mb restrict the candidate files (see rules.py); targets with a
+# higher priority run first, so a drive's size target frees their files before the others'.
+# shared names a folder that cleaners on several stations clean together (see leases.py): the same label,
+# e.g. the share's UNC path, on every station. Empty for a target only this station cleans.
+Target = namedtuple("Target", ["hdd_path", "directory", "space_gb", "period_days", "age_mode", "include", "exclude",
+                               "min_size_mb", "max_size_mb", "priority", "shared"],
+                    defaults=("files", "", "", None, None, 0, ""))
+AGE_MODES = ("files", "folders")
+REQUIRED_COLUMNS = ("HDD", "Directory", "Space (GB)", "Period (Days)")
+
+
+def target_filter(target):
+    # rules.FileFilter of a target, or None when every file is a candidate
+    target = Target(*target)
+    return compile_filter(target.include, target.exclude, target.min_size_mb, target.max_size_mb)
+
+
+def by_priority(target_list):
+    # Stable, so targets of equal priority keep their list order
+    return sorted(target_list, key=lambda target: -Target(*target).priority)
+
+
+def filtered_rule(rule, file_filter):
+    if file_filter is None:
+        return rule
+    return f"{rule}[{file_filter.name}]"
+
+
+def size_rule(target_size_bytes, file_filter=None):
+    # Rule name of a size target in the audit log, metrics and resume state
+    return filtered_rule(f"size:{target_size_bytes / (1024 ** 3):g}", file_filter)
+
+
+def period_rule(target_period_days, age_mode="files", file_filter=None):
+    if age_mode == "folders":
+        return f"folder-period:{target_period_days}"
+    return filtered_rule(f"period:{target_period_days}", file_filter)
+
+
+def target_rules(target):
+    # (rule, directory) pairs a target keeps resume state under
+    target = Target(*target)
+    file_filter = target_filter(target)
+    rules = []
+    if target.period_days is not None:
+        rules.append((period_rule(target.period_days, target.age_mode, file_filter), target.directory))
+    if target.space_gb is not None and target.hdd_path is not None:
+        rules.append((size_rule(target.space_gb * (1024 ** 3), file_filter), target.directory))
+    return rules
+
+
+def optional_float(value):
+    return float(value) if value and value.strip() else None
+
+
+def load_target_list(csv_path=TARGET_CSV_PATH):
+    if not os.path.exists(csv_path):
+        return []
+    with open(csv_path, "r") as csvfile:
+        return parse_target_list(csvfile)
+
+
+def parse_target_list(lines, strict=False):
+    # lines: an open targetlist.csv or any iterable of its lines. Missing trailing cells read as empty,
+    # as they always have; strict (hot reload) rejects them instead, since a file caught while it was
+    # being written looks the same.
+    target_list = []
+    reader = csv.DictReader(lines)
+    for row in reader:
+        if strict and any(row.get(column) is None for column in REQUIRED_COLUMNS):
+            raise ValueError(f"Incomplete row {reader.line_num} in the target list")
+        hdd_path = row["HDD"]
+        directory_to_clean = row["Directory"]
+
+        target_space_gb = row["Space (GB)"]
+        if target_space_gb:
+            target_space_gb = float(target_space_gb)
+        else:
+            target_space_gb = None
+
+        target_period_days = row["Period (Days)"]
+        if target_period_days:
+            target_period_days = int(target_period_days)
+        else:
+            target_period_days = None
+
+        # Optional column, older target lists do not have it
+        age_mode = (row.get("Age Mode") or "files").strip().lower()
+        if age_mode not in AGE_MODES:
+            raise ValueError(f"Unknown Age Mode {age_mode!r} for {directory_to_clean}")
+
+        # Optional filter columns; compiled here so a bad pattern is reported when loading
+        target = Target(hdd_path, directory_to_clean, target_space_gb, target_period_days, age_mode,
+                        (row.get("Include") or "").strip(), (row.get("Exclude") or "").strip(),
+                        optional_float(row.get("Min Size (MB)")), optional_float(row.get("Max Size (MB)")),
+                        int(row.get("Priority") or 0), (row.get("Shared") or "").strip())
+        if target_filter(target) is not None and age_mode == "folders":
+            raise ValueError(f"Whole-folder targets cannot filter files: {directory_to_clean}")
+
+        target_list.append(target)
+    return target_list
+
+
+def parse_reloaded_target_list(lines):
+    return parse_target_list(lines, strict=True)
+
+
+class MonitoringCore:
+    # Deletion engine shared by the Qt MonitoringThread and the headless CLI.
+    # Subclasses may replace the signals with pyqtSignal, everything else is plain Python.
+    status_signal = Signal()
+    log_signal = Signal()
+    log_batch_signal = Signal()
+    countdown_signal = Signal()
+    progress_signal = Signal()
+    targets_signal = Signal()  # The target list after a reload was applied
+
+    def __init__(self, target_list, monitoring_interval, max_workers=8, index_path=None, watch_mode=False, drive_limits=None,
+                 files_per_sec=None, bytes_per_sec=None, checkpoint_bytes=1024 ** 3, progress_interval=0.1, metrics=None,
+                 resume_dir=None, adaptive_interval=False, min_interval=1, scan_processes=0, async_engine=False,
+                 config_path=None, lease_dir=None, lease_ttl=300):
+        super().__init__()
+        self.deleted_file_count = 0
+        self.target_list = target_list
+        self.monitoring_interval = monitoring_interval
+        self.max_workers = max_workers if max_workers > 0 else 4  # Set a default value of 4 if max_workers is 0 or negative
+        self.monitoring = True
+        self.stop_event = threading.Event()  # Set by stop(), wakes the interval wait
+        self.slow_mode = True
+        self.error_count = 0
+        self.file_logger = None  # filelog.FileLogger; gets one audit record per deleted file when set
+        self.index_path = index_path
+        self.file_index = None
+        self.watch_mode = watch_mode
+        self.target_watcher = None
+        self.drive_scheduler = DriveScheduler(drive_limits)  # One target at a time per drive unless configured
+        self.files_per_sec = files_per_sec
+        self.bytes_per_sec = bytes_per_sec
+        # One DeletionEngine per drive_key, so a slow drive's latency backoff and rate limit do not
+        # throttle the drives DriveScheduler runs next to it
+        self.deletion_engines = {}
+        self.deletion_engines_lock = threading.Lock()
+        self.checkpoint_bytes = checkpoint_bytes  # Re-read real free space after this many bytes are deleted
+        # Per-file progress is aggregated here and published as snapshots at most once per progress_interval
+        self.progress = ProgressReporter(self.progress_signal.emit, progress_interval)
+        self.metrics = metrics  # metrics.MonitorMetrics, or None when metrics are disabled
+        self.resume_dir = resume_dir
+        self.resume_store = None
+        # Parallel subtree sizes, cached per folder mtime across cycles
+        self.directory_sizer = DirectorySizer(self.max_workers)
+        # Worker processes for the period rule's scan (pipeline.py); 0 scans in this process
+        self.scan_processes = scan_processes
+        self.scan_pipeline = None
+        self.async_engine = async_engine  # Run cycles on asyncengine.AsyncEngine instead of DriveScheduler threads
+        # Target list file watched for changes (configwatch.py); reloads are applied between cycles
+        self.config_path = config_path
+        self.config_watcher = None
+        self.targets_lock = threading.Lock()
+        self.pending_targets = None
+        # Shared folder for leases.py; cleaners on other stations that use the same one split the targets
+        # with a Shared label with us
+        self.lease_dir = lease_dir
+        self.lease_ttl = lease_ttl
+        self.lease_manager = None
+        # Predicts from the size targets' fill rates when the next cycle is needed; None keeps the fixed interval
+        self.adaptive_interval = None
+        if adaptive_interval:
+            self.adaptive_interval = AdaptiveInterval(target_list, min_interval * 60,
+                                                      monitoring_interval * 60 * ADAPTIVE_MAX_INTERVAL_FACTOR,
+                                                      read_free_space=self.get_hdd_space_remaining)
+
+    def stop(self):
+        # Cooperative stop: deletions finish the file in hand and skip the rest of their batch,
+        # walks save where they are so the next run resumes there
+        self.monitoring = False
+        self.stop_event.set()
+
+    def is_stopped(self):
+        return not self.monitoring
+
+    def resume_key(self, rule, directory):
+        return f"{rule}|{directory}"
+
+    def clear_resume(self, rule, directory):
+        if self.resume_store is not None:
+            self.resume_store.clear(self.resume_key(rule, directory))
+
+    def open_resume_store(self):
+        if self.resume_dir is not None and self.resume_store is None:
+            try:
+                from resume import ResumeStore
+                self.resume_store = ResumeStore(self.resume_dir)
+            except Exception as e:
+                self.log_signal.emit(f"Error opening resume state, cycles will start over: {e}")
+
+    def open_scan_pipeline(self):
+        if self.scan_processes > 0 and self.scan_pipeline is None:
+            try:
+                from pipeline import ScanPipeline
+                self.scan_pipeline = ScanPipeline(self.scan_processes)
+                self.log_signal.emit(f"Scan pipeline: {self.scan_processes} process(es)")
+            except Exception as e:
+                self.log_signal.emit(f"Error starting scan processes, scanning in this process: {e}")
+
+    def close_scan_pipeline(self):
+        if self.scan_pipeline is not None:
+            self.scan_pipeline.close()
+            self.scan_pipeline = None
+
+    def open_lease_manager(self):
+        if self.lease_dir is not None and self.lease_manager is None:
+            try:
+                from leases import LeaseManager
+                self.lease_manager = LeaseManager(self.lease_dir, ttl=self.lease_ttl)
+                self.lease_manager.start()
+                self.log_signal.emit(f"Sharing targets through {self.lease_dir} as {self.lease_manager.owner}")
+            except Exception as e:
+                self.log_signal.emit(f"Error opening lease folder, targets are not shared: {e}")
+
+    def close_lease_manager(self):
+        if self.lease_manager is not None:
+            self.lease_manager.close()
+            self.lease_manager = None
+
+    def acquire_lease(self, name):
+        try:
+            return self.lease_manager.acquire(name)
+        except OSError as e:
+            # Without the lease folder another cleaner may be in there; skip rather than collide
+            self.report_error(f"Error taking lease: {e}", e)
+            return False
+
+    def open_file_index(self):
+        # Opened from run() so the database lives with the worker thread
+        if self.index_path is not None and self.file_index is None:
+            try:
+                from fileindex import FileIndex
+                self.file_index = FileIndex(self.index_path)
+            except Exception as e:
+                self.log_signal.emit(f"Error opening file index, scanning without it: {e}")
+
+    def refresh_file_index(self, directory):
+        scan_start = time.monotonic()
+        relisted = self.file_index.refresh(directory, on_error=self.report_scan_error, is_stopped=self.is_stopped)
+        self.observe_scan(directory, scan_start)
+        if not self.monitoring:
+            # The folders listed so far are committed, so the next refresh continues from there
+            self.log_signal.emit(f"Index update stopped after {relisted} changed folder(s).")
+            return
+        self.log_signal.emit(f"Index updated: {relisted} changed folder(s) rescanned.")
+
+    def start_config_watcher(self):
+        if self.config_path is not None and self.config_watcher is None:
+            try:
+                from configwatch import ConfigWatcher
+                self.config_watcher = ConfigWatcher(self.config_path, parse_reloaded_target_list, self.update_target_list,
+                                                    self.report_config_error)
+                self.config_watcher.start()
+                self.log_signal.emit(f"Watching {self.config_path} for target changes")
+            except Exception as e:
+                self.config_watcher = None
+                self.log_signal.emit(f"Error watching the target list, changes need a restart: {e}")
+
+    def stop_config_watcher(self):
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+            self.config_watcher = None
+
+    def report_config_error(self, e):
+        self.log_signal.emit(f"Target list not reloaded, keeping the current targets: {e}")
+
+    def update_target_list(self, target_list):
+        # Any thread; the new list replaces the running one at the next apply_pending_targets()
+        with self.targets_lock:
+            self.pending_targets = [Target(*target) for target in target_list]
+
+    def apply_pending_targets(self):
+        # Worker thread, between cycles and during the interval. Targets that did not change keep their
+        # resume state, cached folder sizes and index rows; removed or edited ones drop theirs.
+        with self.targets_lock:
+            target_list, self.pending_targets = self.pending_targets, None
+        if target_list is None:
+            return False
+
+        old_targets = {Target(*target) for target in self.target_list}
+        new_targets = set(target_list)
+        removed = old_targets - new_targets
+        added = new_targets - old_targets
+        kept_rules = {rule for target in new_targets for rule in target_rules(target)}
+        kept_directories = {target.directory for target in new_targets}
+        for target in removed:
+            for rule, directory in target_rules(target):
+                if (rule, directory) not in kept_rules:
+                    self.clear_resume(rule, directory)
+            if target.directory not in kept_directories:
+                self.directory_sizer.forget(target.directory)
+                if self.file_index is not None:
+                    self.file_index.forget_root(target.directory)
+
+        self.target_list = target_list
+        if self.adaptive_interval is not None:
+            self.adaptive_interval.set_targets(target_list)
+        if self.target_watcher is not None:
+            self.target_watcher.set_targets(target_list)
+        self.log_signal.emit(f"Target list reloaded: {len(added)} added, {len(removed)} removed, "
+                             f"{len(new_targets & old_targets)} unchanged")
+        self.targets_signal.emit(target_list)
+        return True
+
+    def start_target_watcher(self):
+        if self.watch_mode and self.target_watcher is None:
+            try:
+                from watcher import TargetWatcher
+                self.target_watcher = TargetWatcher(self.target_list,
+                                                    max_retrigger_interval=self.monitoring_interval * 60)
+                watched = self.target_watcher.start()
+                self.log_signal.emit(f"Watch Mode: On ({self.target_watcher.backend.name}, {watched} folder(s) watched)")
+            except Exception as e:
+                self.target_watcher = None
+                self.log_signal.emit(f"Error starting Watch Mode, using interval only: {e}")
+
+    def run(self):
+        self.open_file_index()
+        self.open_resume_store()
+        self.open_scan_pipeline()
+        self.start_target_watcher()
+        self.start_config_watcher()
+        self.open_lease_manager()
+
+        if global_slow_mode:
+            self.log_signal.emit("Slow Mode: On")
+        else:
+            self.log_signal.emit("Slow Mode: Off")
+            
+        try:
+            if self.async_engine:
+                import asyncio
+                from asyncengine import AsyncEngine
+                asyncio.run(AsyncEngine(self).run())
+            else:
+                while self.monitoring:
+                    self.run_cycle()
+                    self.enter_interval_and_update_status()
+        finally:
+            self.stop_config_watcher()
+            self.close_scan_pipeline()
+            self.close_lease_manager()
+
+    def run_cycle(self):
+        # Drives are cleaned in parallel, targets on the same drive respect its concurrency limit
+        cycle_start = self.start_cycle()
+        self.drive_scheduler.run(self.cycle_targets(), self.process_target, self.report_target_done)
+        self.finish_cycle(cycle_start)
+
+    def start_cycle(self):
+        self.apply_pending_targets()
+        self.progress.reset("Monitoring")
+        return time.time()
+
+    def cycle_targets(self):
+        return by_priority(self.target_list)
+
+    def finish_cycle(self, cycle_start):
+        files, size = self.progress.totals()
+        self.log_signal.emit(f"All targets done in {time.time() - cycle_start:.1f}s: "
+                             f"{files} file(s), {size / (1024 ** 3):.2f} GB deleted")
+        if self.metrics is not None:
+            self.metrics.cycles.inc()
+            self.export_metrics()
+
+        if self.target_watcher is not None:
+            self.target_watcher.reconcile()
+
+    def process_target(self, target):
+        hdd_path, directory_to_clean, target_space_gb, target_period_days, age_mode = Target(*target)[:5]
+        file_filter = target_filter(target)
+        shared = Target(*target).shared
+        if not self.monitoring:
+            return
+
+        self.status_signal.emit(f"Checking target: {directory_to_clean}")
+
+        if target_period_days is not None:
+            self.delete_files_by_period(directory_to_clean, target_period_days, age_mode, file_filter, shared)
+
+        if target_space_gb is not None and hdd_path is not None:
+            self.delete_files_by_size(hdd_path, target_space_gb, directory_to_clean, age_mode, file_filter, shared)
+
+    def plan_cycle(self, plan_path):
+        # Dry run: streams what every rule would delete to plan_path without touching any file
+        writer = PlanWriter(plan_path)
+        try:
+            self.drive_scheduler.run(by_priority(self.target_list), lambda target: self.plan_target(target, writer),
+                                     self.report_target_done)
+        finally:
+            writer.close()
+        self.log_signal.emit(f"Deletion plan saved as: {plan_path}")
+
+    def plan_target(self, target, writer):
+        hdd_path, directory_to_clean, target_space_gb, target_period_days, age_mode = Target(*target)[:5]
+        file_filter = target_filter(target)
+        planned_bytes = 0
+        cutoff_mtime = None
+
+        if target_period_days is not None:
+            summary = self.plan_files_by_period(directory_to_clean, target_period_days, writer, age_mode, file_filter)
+            planned_bytes = summary["bytes"]
+            cutoff_mtime = time.time() - target_period_days * 24 * 60 * 60
+
+        if target_space_gb is not None and hdd_path is not None:
+            # The period rule runs first, so its files already count toward the size target
+            self.plan_files_by_size(hdd_path, target_space_gb, directory_to_clean, writer, planned_bytes, cutoff_mtime,
+                                    age_mode, file_filter)
+
+    def plan_files_by_period(self, directory, target_period_days, writer, age_mode="files", file_filter=None):
+        plan = writer.begin_target(directory, period_rule(target_period_days, age_mode, file_filter))
+        cutoff_mtime = time.time() - target_period_days * 24 * 60 * 60
+
+        if os.path.isfile(directory):
+            stat = os.lstat(directory)
+            records = [FileRecord(directory, stat.st_size, stat.st_mtime, False)]
+        elif age_mode == "folders":
+            records = expired_entries(directory, cutoff_mtime, self.report_scan_error, plan.add_listing)
+            for record in records:
+                plan.add(record)
+            return self.finish_plan(plan)
+        elif self.file_index is not None:
+            self.refresh_file_index(directory)
+            for path, parent, child_count in self.file_index.directory_counts(directory):
+                plan.add_directory(path, parent, child_count)
+            records = self.file_index.files_older_than(directory, cutoff_mtime)
+        else:
+            records = scan_directory(directory, on_error=self.report_scan_error, on_listing=plan.add_listing)
+        if file_filter is not None:
+            records = file_filter.select(records)
+
+        for record in records:
+            if record.mtime <= cutoff_mtime:
+                plan.add(record)
+        return self.finish_plan(plan)
+
+    def plan_files_by_size(self, hdd_path, target_space_gb, directory_to_clean, writer, planned_bytes=0, cutoff_mtime=None,
+                           age_mode="files", file_filter=None):
+        plan = writer.begin_target(directory_to_clean, filtered_rule(f"size:{target_space_gb}", file_filter))
+        hdd_space_remaining = self.get_hdd_space_remaining(hdd_path) + planned_bytes
+        bytes_needed = target_space_gb * (1024 ** 3) - hdd_space_remaining
+
+        if age_mode == "folders":
+            for record in self.oldest_folders(directory_to_clean, bytes_needed, cutoff_mtime):
+                plan.add(record)
+            return self.finish_plan(plan)
+
+        if self.file_index is not None:
+            self.refresh_file_index(directory_to_clean)
+            for path, parent, child_count in self.file_index.directory_counts(directory_to_clean):
+                plan.add_directory(path, parent, child_count)
+            records = self.file_index.oldest_files(directory_to_clean)
+        else:
+            records = scan_directory(directory_to_clean, on_error=self.report_scan_error, on_listing=plan.add_listing)
+        if cutoff_mtime is not None:
+            records = (record for record in records if record.mtime > cutoff_mtime)
+        if file_filter is not None:
+            records = file_filter.select(records)
+
+        if self.file_index is not None:
+            file_data = take_oldest(records, bytes_needed)
+        else:
+            file_data = select_oldest_table(records, bytes_needed)
+        for record in file_data:
+            plan.add(record)
+        return self.finish_plan(plan)
+
+    def finish_plan(self, plan):
+        summary = plan.finish(estimate_seconds(plan.files, plan.bytes, *self.deletion_limits()))
+        if summary["files"]:
+            oldest = datetime.fromtimestamp(summary["oldest_mtime"])
+            newest = datetime.fromtimestamp(summary["newest_mtime"])
+            age_range = f", {oldest:%Y-%m-%d %H:%M} to {newest:%Y-%m-%d %H:%M}"
+        else:
+            age_range = ""
+        if summary["estimated_seconds"] is not None:
+            estimate = f"~{summary['estimated_seconds'] / 60:.1f} min"
+        else:
+            estimate = "unthrottled"
+        self.log_signal.emit(f"Plan {plan.directory} ({plan.rule}): {summary['files']} file(s), "
+                             f"{summary['bytes'] / (1024 ** 3):.2f} GB{age_range}, {estimate}")
+        return summary
+
+    def execute_plan(self, plan_path):
+        # Deletes a saved plan without scanning again. Files that changed since planning are skipped.
+        pruner = DirectoryPruner()
+        deleted = 0
+        skipped = 0
+        batch = []
+
+        def flush():
+            nonlocal deleted, skipped
+            unchanged = [record for record in batch if self.plan_record_unchanged(record)]
+            skipped += len(batch) - len(unchanged)
+            deleted += len(unchanged)
+            self.delete_files_batch(unchanged, pruner, f"plan:{plan_path}")
+            batch.clear()
+
+        for kind, _, item in read_plan(plan_path):
+            if not self.monitoring:
+                break
+            if kind == "dir":
+                path, is_root, child_count = item
+                pruner.add_directory(path, None if is_root else os.path.dirname(path), child_count)
+            elif kind == "file":
+                batch.append(item)
+                if len(batch) >= 500:
+                    flush()
+        if batch and self.monitoring:
+            flush()
+
+        self.prune_empty_folders(pruner)
+        self.log_signal.emit(f"Plan executed: {deleted} file(s) deleted, {skipped} changed file(s) skipped.")
+
+    def plan_record_unchanged(self, record):
+        try:
+            stat = os.lstat(record.path)
+        except OSError:
+            return False
+        if record.is_dir:
+            return stat.st_mtime == record.mtime  # A folder's size in the plan is its subtree's
+        return stat.st_size == record.size and stat.st_mtime == record.mtime
+
+    def observe_scan(self, directory, scan_start):
+        if self.metrics is not None:
+            self.metrics.scan_seconds.observe(time.monotonic() - scan_start, (directory,))
+
+    def export_metrics(self):
+        try:
+            self.metrics.export()
+        except OSError as e:
+            self.log_signal.emit(f"Error writing metrics: {e}")
+
+    def report_error(self, status_message, e):
+        self.error_count += 1
+        if self.metrics is not None:
+            self.metrics.errors.inc((type(e).__name__,))
+        self.status_signal.emit(status_message)
+        self.log_signal.emit(f"Error: {e}")
+
+    def report_target_done(self, target, seconds, error):
+        if error is not None:
+            self.report_error(f"Error cleaning {target[1]}: {error}", error)
+        self.progress.flush()
+        if self.metrics is not None:
+            self.metrics.target_seconds.observe(seconds, (target[1],))
+            self.export_metrics()
+        self.log_signal.emit(f"Target done: {target[1]} ({seconds:.1f}s)")
+
+    def delete_files_by_size(self, hdd_path, target_space_gb, directory_to_clean, age_mode="files", file_filter=None,
+                             shared=""):
+        if self.monitoring == True:
+            hdd_space_remaining = self.get_hdd_space_remaining(hdd_path)
+            hdd_space_remaining_gb = hdd_space_remaining / (1024 ** 3)
+            calculated_size = target_space_gb - hdd_space_remaining_gb
+            self.log_signal.emit(f"Target path: {directory_to_clean}")
+            self.log_signal.emit(f"{hdd_path} Drive's target size: {target_space_gb:.2f} GB")
+            if self.metrics is not None:
+                self.metrics.target_free_bytes.set(target_space_gb * (1024 ** 3), (hdd_path, directory_to_clean))
+            self.log_signal.emit(f"{hdd_path} Drive's remaining size: {hdd_space_remaining_gb:.2f} GB")
+            if hdd_space_remaining < target_space_gb * (1024 ** 3):  # Convert target_space_gb to bytes
+                self.log_signal.emit(f"Total Deleting files size: {calculated_size:.2f} GB.")
+                if not shared or self.lease_manager is None:
+                    self.delete_files_until_target_size(hdd_path, target_space_gb * (1024 ** 3), directory_to_clean,
+                                                        hdd_space_remaining, age_mode, file_filter)
+                    return
+                # Shared volume: one cleaner at a time picks the globally oldest files
+                lease = self.lease_manager.name(shared, size_rule(target_space_gb * (1024 ** 3), file_filter))
+                if not self.acquire_lease(lease):
+                    self.log_signal.emit(f"{directory_to_clean} is being cleaned by another cleaner, skipped.")
+                    return
+                try:
+                    self.delete_files_until_target_size(hdd_path, target_space_gb * (1024 ** 3), directory_to_clean,
+                                                        None, age_mode, file_filter)
+                finally:
+                    # Free right away: the next cleaner re-reads the free space and stops if it is enough
+                    self.lease_manager.release(lease, done=False)
+            else:
+                # Enough space now, so an interrupted selection is no longer needed
+                self.clear_resume(size_rule(target_space_gb * (1024 ** 3), file_filter), directory_to_clean)
+        else:
+            self.status_signal.emit(f"Stopped")
+
+    def get_hdd_space_remaining(self, hdd_path):
+        free_bytes = psutil.disk_usage(hdd_path).free
+        if self.metrics is not None:
+            self.metrics.free_bytes.set(free_bytes, (hdd_path,))
+        return free_bytes
+
+    def delete_files_until_target_size(self, hdd_path, target_size_bytes, directory_to_clean, hdd_space_remaining=None,
+                                       age_mode="files", file_filter=None):
+        if hdd_space_remaining is None:
+            hdd_space_remaining = self.get_hdd_space_remaining(hdd_path)
+        bytes_needed = target_size_bytes - hdd_space_remaining
+        pruner = DirectoryPruner()
+        rule = size_rule(target_size_bytes, file_filter)
+        resume_key = self.resume_key(rule, directory_to_clean)
+        # Index and folder selections are cheap to redo, only a full file walk is worth resuming
+        resumable = self.resume_store is not None and self.file_index is None and age_mode == "files"
+        resumed = None
+        if resumable:
+            resumed = self.resume_store.load(resume_key)
+
+        if age_mode == "folders":
+            # Whole subfolders, oldest first by their newest file
+            file_data = self.oldest_folders(directory_to_clean, bytes_needed)
+            self.log_selection(file_data)
+        elif resumed is not None:
+            # Continue the selection an interrupted run saved instead of walking the tree again.
+            # Those records are re-checked before deleting, like a saved plan.
+            offset = resumed["offset"]
+            file_data = self.resume_store.read_selection(resume_key, offset)
+            self.log_signal.emit(f"Resuming {directory_to_clean} at selected file {offset}.")
+        elif self.file_index is not None and self.monitoring == True:
+            # The index is already ordered by mtime, so stop reading once the deficit is covered
+            self.refresh_file_index(directory_to_clean)
+            self.add_index_counts(pruner, directory_to_clean)
+            records = self.file_index.oldest_files(directory_to_clean)
+            if file_filter is not None:
+                records = file_filter.select(records)
+            file_data = take_oldest(records, bytes_needed)
+            self.log_selection(file_data)
+        else:
+            # Stream the scan and keep only the oldest files needed to cover the deficit (oldest first)
+            scan_start = time.monotonic()
+            records = takewhile(lambda record: self.monitoring, self.get_files_to_delete_by_size(directory_to_clean, pruner))
+            if file_filter is not None:
+                records = file_filter.select(records)
+            file_data = select_oldest_table(records, bytes_needed)
+            self.observe_scan(directory_to_clean, scan_start)
+            if not self.monitoring:
+                return  # Stopped mid-scan, the partial selection is not the oldest files
+            if resumable:
+                self.resume_store.write_selection(resume_key, file_data)
+            offset = 0
+            self.log_selection(file_data)
+
+        # Count freed bytes from the scanned sizes and only re-check the drive at checkpoints
+        budget = ByteBudget(target_size_bytes, hdd_space_remaining,
+                            lambda: self.get_hdd_space_remaining(hdd_path), self.checkpoint_bytes)
+        for batch in batched(file_data):
+            if budget.satisfied() or not self.monitoring:
+                break
+
+            taken = budget.take(batch)
+            if resumed is not None:
+                to_delete = [record for record in taken if self.plan_record_unchanged(record)]
+            else:
+                to_delete = taken
+            budget.add(self.delete_files_batch(to_delete, pruner, rule, directory_to_clean))
+            if resumable and self.monitoring:
+                # A batch cut short by stop() is not counted; its deleted files are skipped on resume
+                offset += len(taken)
+                self.resume_store.save(resume_key, {"offset": offset})
+
+        if resumable:
+            if self.monitoring:
+                self.resume_store.clear(resume_key)
+            else:
+                self.resume_store.save(resume_key, {"offset": offset}, force=True)
+
+        self.prune_empty_folders(pruner)
+        self.log_signal.emit(f"Freed {budget.freed / (1024 ** 3):.2f} GB on {hdd_path} "
+                             f"({budget.checks} free space check(s)).")
+
+    def oldest_folders(self, directory, bytes_needed, newer_than=None):
+        # Direct subfolders of directory as whole-folder records dated by their newest file,
+        # plus its loose files, oldest first until bytes_needed is covered
+        scan_start = time.monotonic()
+        totals = self.directory_sizer.measure(directory, self.report_scan_error, self.is_stopped)
+        self.observe_scan(directory, scan_start)
+        if not self.monitoring:
+            return []  # Partial sizes; the next cycle measures again from the cached folders
+        candidates = [FileRecord(stats.path, stats.size, stats.newest_mtime or 0, True)
+                      for stats in self.directory_sizer.child_folders(directory, totals)]
+        try:
+            candidates.extend(list_directory(directory, self.report_scan_error)[1])
+        except OSError as e:
+            self.report_scan_error(e)
+        if newer_than is not None:
+            candidates = [record for record in candidates if record.mtime > newer_than]
+        candidates.sort(key=lambda record: record.mtime)
+        return take_oldest(candidates, bytes_needed)
+
+    def log_selection(self, file_data):
+        if isinstance(file_data, FileTable):
+            selected_size = file_data.total_size()  # Without building every record
+        else:
+            selected_size = sum(record.size for record in file_data)
+        self.log_signal.emit(f"Selected {len(file_data)} file(s), {selected_size / (1024 ** 3):.2f} GB.")
+
+    def deletion_limits(self):
+        # Slow Mode caps the configured rate instead of sleeping after every delete
+        files_per_sec = self.files_per_sec
+        if global_slow_mode:
+            files_per_sec = min(files_per_sec or SLOW_MODE_FILES_PER_SEC, SLOW_MODE_FILES_PER_SEC)
+        return files_per_sec, self.bytes_per_sec
+
+    def delete_files_batch(self, files_to_delete, pruner=None, rule=None, directory=None):
+        # files_to_delete are scan records; returns the total size freed.
+        # rule and directory (the target) label the audit log and metrics.
+        def delete_record(record):
+            try:
+                return self.delete_file(record.path, record.size, pruner, rule, record.mtime, directory, record.is_dir)
+            except Exception as e:
+                self.report_error(f"Error deleting file: {e}", e)
+                return 0
+
+        if not files_to_delete:
+            return 0
+        deletion_engine = self.deletion_engine_for(directory or files_to_delete[0].path)
+        deletion_engine.set_limits(*self.deletion_limits())
+        return sum(deletion_engine.delete_batch(files_to_delete, delete_record, self.is_stopped))
+
+    def deletion_engine_for(self, path):
+        # Same drive grouping as DriveScheduler for targets; other paths (e.g. plans) by their drive
+        normalized = os.path.normpath(path)
+        drive = None
+        for target in self.target_list:
+            directory = os.path.normpath(target[1])
+            if normalized == directory or normalized.startswith(directory.rstrip(os.sep) + os.sep):
+                drive = drive_key(target[0], target[1])
+                break
+        if drive is None:
+            drive = os.path.normcase(os.path.splitdrive(normalized)[0])
+        with self.deletion_engines_lock:
+            deletion_engine = self.deletion_engines.get(drive)
+            if deletion_engine is None:
+                deletion_engine = DeletionEngine(self.max_workers, self.files_per_sec, self.bytes_per_sec)
+                if self.metrics is not None:
+                    deletion_engine.latency_observer = self.metrics.delete_seconds.observe
+                self.deletion_engines[drive] = deletion_engine
+        return deletion_engine
+
+    def delete_file(self, file_path, file_size=None, pruner=None, rule=None, file_mtime=None, directory=None, is_dir=False):
+        if self.monitoring == True:
+            try:
+                if is_dir:
+                    # A whole expired folder, removed in one call; folders judged by name were not sized yet
+                    if not file_size:
+                        file_size = self.directory_sizer.size(file_path)
+                    shutil.rmtree(file_path)
+
+                elif file_size is not None:
+                    # Size is already known from the scan, so skip the extra stat calls
+                    os.remove(file_path)
+
+                elif os.path.isfile(file_path):
+                    file_size = os.path.getsize(file_path)
+                    os.remove(file_path)
+
+                elif os.path.isdir(file_path):
+                    # Size the whole subtree first so the freed bytes are accounted for
+                    file_size = self.directory_sizer.size(file_path)
+                    shutil.rmtree(file_path)
+
+                # Emptied folders are removed once by the pruning pass after the target
+                if pruner is not None:
+                    pruner.removed(file_path)
+                if self.file_logger is not None:
+                    self.file_logger.log_deletion(file_path, file_size or 0, file_mtime, rule)
+                self.progress.deleted(file_path, file_size or 0)
+                if self.metrics is not None:
+                    self.metrics.files_deleted.inc((directory, rule))
+                    self.metrics.bytes_deleted.inc((directory, rule), file_size or 0)
+
+                # Update the space after deletion
+                return file_size or 0
+
+            except Exception as e:
+                self.report_error(f"Error deleting file or directory: {e}", e)
+        else:
+            self.status_signal.emit(f"Stopped")
+
+        return 0
+
+    def get_files_to_delete_by_size(self, directory, pruner=None):
+        if self.monitoring == True:
+            # Generator, so the whole tree is never held in memory
+            on_listing = pruner.add_listing if pruner is not None else None
+            return scan_directory(directory, on_error=self.report_scan_error, on_listing=on_listing)
+        else:
+            self.status_signal.emit(f"Stopped")
+
+        return []
+
+    def delete_files_by_period(self, directory, target_period_days, age_mode="files", file_filter=None, shared=""):
+        current_time = time.time()
+        deleted_files = []
+        self.log_signal.emit(f"Target Path: {directory}.")
+        if age_mode == "folders":
+            self.log_signal.emit(f"Delete all the folders older than {target_period_days} day(s).")
+        else:
+            self.log_signal.emit(f"Delete all the files older than {target_period_days} day(s).")
+        if self.monitoring == True:
+            if os.path.isfile(directory):
+                self.delete_files_in_file_condition(directory, directory, current_time, target_period_days, file_filter)
+            elif os.path.isdir(directory) and shared and self.lease_manager is not None:
+                self.delete_shared_by_period(directory, shared, current_time, target_period_days, age_mode,
+                                             file_filter)
+            elif os.path.isdir(directory):
+                pruner = DirectoryPruner()
+                if age_mode == "folders":
+                    self.delete_folders_in_directory_condition(directory, current_time, target_period_days, pruner)
+                else:
+                    self.delete_files_in_directory_condition(directory, current_time, target_period_days, pruner,
+                                                             file_filter)
+                self.prune_empty_folders(pruner)
+        else:
+            self.status_signal.emit(f"Stopped")
+
+        return deleted_files
+            
+    def delete_shared_by_period(self, directory, shared, current_time, target_period_days, age_mode="files",
+                                file_filter=None):
+        # Shared volume: one lease per subfolder (plus one for the loose files), so cooperating cleaners
+        # each walk a part of the tree. Whole-folder mode decides at the top level and takes one lease.
+        rule = period_rule(target_period_days, age_mode, file_filter)
+        if age_mode == "folders":
+            lease = self.lease_manager.name(shared, rule)
+            if not self.acquire_lease(lease):
+                self.log_signal.emit(f"{directory} is being cleaned by another cleaner, skipped.")
+                return
+            try:
+                pruner = DirectoryPruner()
+                self.delete_folders_in_directory_condition(directory, current_time, target_period_days, pruner)
+                self.prune_empty_folders(pruner)
+            finally:
+                self.lease_manager.release(lease, done=self.monitoring)
+            return
+
+        try:
+            dir_records, file_records = list_directory(directory, self.report_scan_error)
+        except OSError as e:
+            self.report_scan_error(e)
+            return
+        parts = ["."] + [os.path.basename(record.path) for record in dir_records]
+        cleaned = 0
+        skipped = 0
+        for part in self.lease_manager.spread(parts):
+            if not self.monitoring:
+                break
+            lease = self.lease_manager.name(shared, rule, part)
+            if not self.acquire_lease(lease):
+                skipped += 1
+                continue
+            try:
+                if part == ".":
+                    expired = [record for record in file_records
+                               if current_time - record.mtime >= target_period_days * 24 * 60 * 60]
+                    if file_filter is not None:
+                        expired = list(file_filter.select(expired))
+                    for batch in batched(expired):
+                        self.delete_files_batch(batch, None, rule, directory)
+                else:
+                    partition = os.path.join(directory, part)
+                    pruner = DirectoryPruner()
+                    # Link to the target so the subfolder itself goes once emptied; the walk sets its count
+                    pruner.add_directory(partition, directory, 1)
+                    self.delete_files_in_directory_condition(partition, current_time, target_period_days, pruner,
+                                                             file_filter, directory)
+                    self.prune_empty_folders(pruner)
+                cleaned += 1
+            finally:
+                # A part cut short by stop() is free for the next cleaner at once
+                self.lease_manager.release(lease, done=self.monitoring)
+        self.log_signal.emit(f"Shared target {directory}: {cleaned} part(s) cleaned here, "
+                             f"{skipped} taken by other cleaners.")
+
+    def delete_files_in_file_condition(self, directory, file_path, current_time, target_period_days, file_filter=None):
+        if not self.monitoring:
+            self.status_signal.emit(f"Stopped")
+            return
+
+        try:
+            stat = os.stat(file_path)
+            time_difference = current_time - stat.st_mtime
+            if time_difference >= target_period_days * 24 * 60 * 60:
+                record = FileRecord(file_path, stat.st_size, stat.st_mtime, False)
+                if os.path.isfile(file_path) and (file_filter is None or file_filter.matches(record)):
+                    self.delete_files_batch([record], rule=period_rule(target_period_days, file_filter=file_filter),
+                                            directory=directory)
+        except Exception as e:
+            self.report_error(f"Error deleting file: {e}", e)
+
+
+            
+    def delete_files_in_index_condition(self, directory, current_time, target_period_days, pruner, file_filter=None,
+                                        target_directory=None):
+        # Range lookup on the index instead of walking the whole tree
+        self.refresh_file_index(directory)
+        self.add_index_counts(pruner, directory)
+        cutoff_mtime = current_time - target_period_days * 24 * 60 * 60
+        records = self.file_index.files_older_than(directory, cutoff_mtime)
+        if file_filter is not None:
+            records = file_filter.select(records)
+        for batch in batched(records):
+            if not self.monitoring:
+                return
+            self.delete_files_batch(batch, pruner, period_rule(target_period_days, file_filter=file_filter),
+                                    target_directory or directory)
+
+    def delete_files_in_directory_condition(self, directory, current_time, target_period_days, pruner, file_filter=None,
+                                            target_directory=None):
+        # target_directory labels the audit log and metrics when directory is only a part of the target
+        if self.file_index is not None:
+            self.delete_files_in_index_condition(directory, current_time, target_period_days, pruner, file_filter,
+                                                 target_directory)
+            return
+        if self.scan_pipeline is not None:
+            self.delete_files_in_pipeline_condition(directory, current_time, target_period_days, pruner, file_filter,
+                                                    target_directory)
+            return
+
+        rule = period_rule(target_period_days, file_filter=file_filter)
+        resume_key = self.resume_key(rule, directory)
+        stack = [directory]
+        resumed = self.resume_store.load(resume_key) if self.resume_store is not None else None
+        if resumed is not None:
+            # Folders an interrupted walk had not finished; the ones before them are done
+            stack = resumed["stack"]
+            self.log_signal.emit(f"Resuming {directory} with {len(stack)} folder(s) left to walk.")
+
+        for root, dirs, files in walk_records(directory, on_error=self.report_scan_error, stack=stack):
+            if self.monitoring:
+                pruner.add_listing(root, dirs, files)
+                expired = [record for record in files
+                           if current_time - record.mtime >= target_period_days * 24 * 60 * 60]
+                if file_filter is not None:
+                    expired = list(file_filter.select(expired))
+                for batch in batched(expired):
+                    if not self.monitoring:
+                        break
+                    self.delete_files_batch(batch, pruner, rule, target_directory or directory)
+
+            if not self.monitoring:
+                # root is listed again on resume, which also queues its subfolders
+                if self.resume_store is not None:
+                    self.resume_store.save(resume_key, {"stack": stack + [root]}, force=True)
+                return
+            if self.resume_store is not None and self.resume_store.due():
+                # The walk pushes root's subfolders after this step, so add them to the saved stack
+                self.resume_store.save(resume_key, {"stack": stack + [record.path for record in reversed(dirs)]})
+
+        self.clear_resume(rule, directory)
+
+    def delete_files_in_pipeline_condition(self, directory, current_time, target_period_days, pruner, file_filter=None,
+                                           target_directory=None):
+        # Worker processes walk the subtrees and filter by age, this thread only deletes what they send.
+        # Unlike the in-process walk this is not resumed after a stop; the next cycle scans again.
+        cutoff_mtime = current_time - target_period_days * 24 * 60 * 60
+        rule = period_rule(target_period_days, file_filter=file_filter)
+        batches = self.scan_pipeline.expired_batches(directory, cutoff_mtime, file_filter, self.report_scan_error,
+                                                     pruner.add_listing, self.is_stopped)
+        for listings, records in batches:
+            for folder, child_count in listings:
+                pruner.add_directory(folder, os.path.dirname(folder), child_count)
+            if scanner.stat_counter is not None:
+                scanner.stat_counter(sum(child_count for _, child_count in listings))
+            for batch in batched(records):
+                if not self.monitoring:
+                    break
+                self.delete_files_batch(batch, pruner, rule, target_directory or directory)
+
+    def delete_folders_in_directory_condition(self, directory, current_time, target_period_days, pruner):
+        # One decision per folder: expired subtrees go in a single rmtree, only mixed folders are walked
+        cutoff_mtime = current_time - target_period_days * 24 * 60 * 60
+        rule = period_rule(target_period_days, "folders")
+        entries = expired_entries(directory, cutoff_mtime, self.report_scan_error, pruner.add_listing)
+        for batch in batched(entries, 50):
+            if not self.monitoring:
+                return
+            self.delete_files_batch(batch, pruner, rule, directory)
+
+    def add_index_counts(self, pruner, directory):
+        for path, parent, child_count in self.file_index.directory_counts(directory):
+            pruner.add_directory(path, parent, child_count)
+
+    def prune_empty_folders(self, pruner):
+        # One bottom-up pass over the folders seen by the scan, no re-listing
+        if not self.monitoring:
+            return
+
+        def on_error(e):
+            self.report_error(f"Error deleting folder: {e}", e)
+
+        pruner.prune(self.progress.removed_folder, on_error)
+
+    def report_scan_error(self, e):
+        self.report_error(f"Error reading file data: {e}", e)
+                
+    def plan_interval(self):
+        # Seconds to wait before the next cycle
+        nominal_seconds = self.monitoring_interval * 60  # Convert minutes to seconds
+        if self.adaptive_interval is None:
+            return nominal_seconds
+        self.adaptive_interval.set_targets(self.target_list)
+        self.adaptive_interval.restart()
+        return self.adaptive_interval.next_interval(nominal_seconds)
+
+    def replan_interval(self, remaining_seconds):
+        # Samples free space every few seconds while waiting and brings the next cycle forward when
+        # a drive fills faster than predicted. Never postpones it.
+        if self.adaptive_interval is None or not self.adaptive_interval.due():
+            return remaining_seconds
+        self.adaptive_interval.sample()
+        planned_seconds = self.adaptive_interval.next_interval(self.monitoring_interval * 60)
+        if planned_seconds < remaining_seconds:
+            self.log_signal.emit(f"Adaptive interval: drives are filling faster, next cycle in {planned_seconds}s")
+            return planned_seconds
+        return remaining_seconds
+
+    def enter_interval_and_update_status(self):
+        remaining_seconds = self.plan_interval()
+        interval_minutes = f"{remaining_seconds / 60:g}" if remaining_seconds % 60 else f"{remaining_seconds // 60}"
+        self.log_signal.emit(f"Waiting for next cycle: {interval_minutes} min(s)")
+        # Set once; the per-second countdown goes to countdown_signal only
+        self.status_signal.emit(f"Next Monitoring will start in {interval_minutes} min(s)")
+        while remaining_seconds > 0 and self.monitoring:
+            minutes = remaining_seconds // 60
+            seconds = remaining_seconds % 60
+            countdown_text = f"Next monitoring will start in...{minutes}min {seconds}sec"
+            self.countdown_signal.emit(countdown_text)
+            if self.target_watcher is not None:
+                # Wait on filesystem events instead of sleeping, and clean up as soon as a drive runs low
+                for target in self.target_watcher.wait(1):
+                    hdd_path, directory_to_clean, target_space_gb, _, age_mode = Target(*target)[:5]
+                    self.log_signal.emit(f"Watch Mode: {hdd_path} dropped below {target_space_gb:.2f} GB free.")
+                    self.delete_files_by_size(hdd_path, target_space_gb, directory_to_clean, age_mode,
+                                              target_filter(target), Target(*target).shared)
+            else:
+                self.stop_event.wait(1)  # Sleep for 1 second, or less if stopped
+            remaining_seconds = self.replan_interval(remaining_seconds - 1)
+            self.apply_pending_targets()
+        
+        self.status_signal.emit("Monitoring")  # Emit "Monitoring" status signal
+        self.log_signal.emit("Next monitoring cycle starting.")
+        
+    def set_max_workers(self, max_workers):
+        self.max_workers = max_workers
+        with self.deletion_engines_lock:
+            for deletion_engine in self.deletion_engines.values():
+                deletion_engine.max_workers = max(1, max_workers)
+        self.directory_sizer.max_workers = max(1, max_workers)
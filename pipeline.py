@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+import queue
+import signal
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.managers import SyncManager
+
+from scanner import FileRecord, list_directory, walk_records
+
+# Multi-process scan stage for the period rule. The target is split into subtrees, each walked by a
+# worker process that does the listing, age comparison and filtering on its own core and streams
+# candidates back as CandidateBatch buffers through a bounded queue. The deletion stage in the parent
+# consumes batches as they arrive; a full queue makes the workers wait until it catches up.
+
+BATCH_SIZE = 5000
+QUEUE_BATCHES = 16
+MAX_ERRORS = 100  # Per partition; errors beyond this are only counted
+
+class CandidateBatch:
+    # Columnar batch of candidate files: folder table + per-file folder id, names in one buffer, and
+    # size/mtime arrays. Pickles to a few bytes per file instead of a tuple of objects per file.
+    # folders also carries every listed folder's child count, for pruning emptied folders afterwards.
+
+    def __init__(self):
+        self.folders = []
+        self.child_counts = array("q")
+        self.folder_ids = array("I")
+        self.names = bytearray()
+        self.name_ends = array("I")
+        self.sizes = array("q")
+        self.mtimes = array("d")
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def add_folder(self, folder, child_count):
+        self.folders.append(folder)
+        self.child_counts.append(child_count)
+        return len(self.folders) - 1
+
+    def add(self, folder_id, name, size, mtime):
+        self.folder_ids.append(folder_id)
+        self.names += os.fsencode(name)
+        self.name_ends.append(len(self.names))
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+
+    def records(self):
+        start = 0
+        for folder_id, end, size, mtime in zip(self.folder_ids, self.name_ends, self.sizes, self.mtimes):
+            name = os.fsdecode(bytes(self.names[start:end]))
+            start = end
+            yield FileRecord(os.path.join(self.folders[folder_id], name), size, mtime, False)
+
+
+def ignore_interrupts():
+    # Ctrl+C reaches the whole process group; only the parent handles it, by stopping cooperatively
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def put_batch(batch_queue, stop_event, batch):
+    # Blocks while the queue is full, but gives up once the parent has asked to stop
+    while not stop_event.is_set():
+        try:
+            batch_queue.put(batch, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def scan_partition(directory, cutoff_mtime, file_filter, batch_queue, stop_event):
+    # Runs in a worker: walks one subtree and queues its expired files in batches.
+    # Returns (batches queued, errors, error count); file_filter is a rules.FileFilter or None,
+    # pickled with the task.
+    batches = 0
+    errors = []
+    error_count = 0
+
+    def on_error(e):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_ERRORS:
+            errors.append(e)
+
+    batch = CandidateBatch()
+    for root, dir_records, file_records in walk_records(directory, on_error):
+        if stop_event.is_set():
+            return batches, errors, error_count
+        folder_id = batch.add_folder(root, len(dir_records) + len(file_records))
+        for record in file_records:
+            if record.mtime <= cutoff_mtime and (file_filter is None or file_filter.matches(record)):
+                batch.add(folder_id, os.path.basename(record.path), record.size, record.mtime)
+        if len(batch) >= BATCH_SIZE:
+            if not put_batch(batch_queue, stop_event, batch):
+                return batches, errors, error_count
+            batches += 1
+            batch = CandidateBatch()
+    if batch.folders and put_batch(batch_queue, stop_event, batch):
+        batches += 1
+    return batches, errors, error_count
+
+
+def split_partitions(directory, min_partitions, on_error=None, on_listing=None, max_listings=256):
+    # Lists folders breadth-first in this process, replacing each by its subfolders, until there are
+    # min_partitions subtrees for the workers. Returns (subtrees, file records of the folders listed here).
+    partitions = deque([directory])
+    top_files = []
+    listings = 0
+    while partitions and len(partitions) < min_partitions and listings < max_listings:
+        folder = partitions.popleft()
+        listings += 1
+        try:
+            dir_records, file_records = list_directory(folder, on_error)
+        except OSError as e:
+            if on_error is not None:
+                on_error(e)
+            continue
+        if on_listing is not None:
+            on_listing(folder, dir_records, file_records)
+        top_files.extend(file_records)
+        partitions.extend(record.path for record in dir_records)
+    return list(partitions), top_files
+
+
+class ScanPipeline:
+    # Process pool for scan_partition, created once and reused across targets and cycles.
+    # Every target gets its own queue and stop event from the manager, so targets on different drives
+    # can use the pool at the same time.
+
+    def __init__(self, processes):
+        self.processes = max(1, processes)
+        context = multiprocessing.get_context("spawn")  # Same behaviour on Windows and elsewhere
+        self.manager = SyncManager(ctx=context)
+        self.manager.start(ignore_interrupts)
+        self.executor = ProcessPoolExecutor(self.processes, mp_context=context, initializer=ignore_interrupts)
+
+    def expired_batches(self, directory, cutoff_mtime, file_filter=None, on_error=None, on_listing=None,
+                        is_stopped=None):
+        # Yields (folder listings, file records) per batch: folder listings are (folder, child_count)
+        # pairs for the pruner. Stops the workers when is_stopped() turns true or the caller closes it.
+        partitions, top_files = split_partitions(directory, self.processes * 4, on_error, on_listing)
+        top_expired = [record for record in top_files if record.mtime <= cutoff_mtime
+                       and (file_filter is None or file_filter.matches(record))]
+        if top_expired:
+            yield [], top_expired
+
+        batch_queue = self.manager.Queue(QUEUE_BATCHES)
+        stop_event = self.manager.Event()
+        futures = [self.executor.submit(scan_partition, partition, cutoff_mtime, file_filter, batch_queue, stop_event)
+                   for partition in partitions]
+        received = 0
+        try:
+            while True:
+                if is_stopped is not None and is_stopped():
+                    return
+                try:
+                    batch = batch_queue.get(timeout=0.2)
+                except queue.Empty:
+                    if all(future.done() for future in futures) and received >= sum(
+                            future.result()[0] for future in futures):
+                        break
+                    continue
+                received += 1
+                yield list(zip(batch.folders, batch.child_counts)), list(batch.records())
+
+            for future in futures:
+                _, errors, error_count = future.result()
+                if on_error is not None:
+                    for e in errors:
+                        on_error(e)
+                    if error_count > len(errors):
+                        on_error(OSError(f"{error_count - len(errors)} more scan error(s) under {directory}"))
+        finally:
+            # Workers still walking see the event at their next folder or blocked put
+            stop_event.set()
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.manager.shutdown()
@@ -0,0 +1,93 @@
+import json
+from threading import Lock
+
+from scanner import FileRecord
+
+# A plan is a JSON-lines file. Per target it holds "dir" lines (folder child counts, for pruning
+# without re-listing), "file" lines (candidates in deletion order) and one closing "target" summary.
+
+
+def estimate_seconds(files, size, files_per_sec=None, bytes_per_sec=None):
+    # None when deletion is unthrottled and there is no rate to estimate from
+    estimates = []
+    if files_per_sec:
+        estimates.append(files / files_per_sec)
+    if bytes_per_sec:
+        estimates.append(size / bytes_per_sec)
+    return max(estimates) if estimates else None
+
+
+class TargetPlan:
+    def __init__(self, writer, target_id, directory, rule):
+        self.writer = writer
+        self.target_id = target_id
+        self.directory = directory
+        self.rule = rule
+        self.files = 0
+        self.bytes = 0
+        self.oldest_mtime = None
+        self.newest_mtime = None
+
+    def add_listing(self, root, dir_records, file_records):
+        self.writer.write({"type": "dir", "target": self.target_id, "path": root,
+                           "root": root == self.directory, "count": len(dir_records) + len(file_records)})
+
+    def add_directory(self, path, parent, child_count):
+        self.writer.write({"type": "dir", "target": self.target_id, "path": path,
+                           "root": parent is None, "count": child_count})
+
+    def add(self, record):
+        self.files += 1
+        self.bytes += record.size
+        if self.oldest_mtime is None or record.mtime < self.oldest_mtime:
+            self.oldest_mtime = record.mtime
+        if self.newest_mtime is None or record.mtime > self.newest_mtime:
+            self.newest_mtime = record.mtime
+        entry = {"type": "file", "target": self.target_id, "path": record.path, "size": record.size, "mtime": record.mtime}
+        if record.is_dir:
+            entry["is_dir"] = True  # Whole folder, from a folder age rule
+        self.writer.write(entry)
+
+    def finish(self, estimated_seconds):
+        summary = {"type": "target", "target": self.target_id, "directory": self.directory, "rule": self.rule,
+                   "files": self.files, "bytes": self.bytes, "oldest_mtime": self.oldest_mtime,
+                   "newest_mtime": self.newest_mtime, "estimated_seconds": estimated_seconds}
+        self.writer.write(summary)
+        return summary
+
+
+class PlanWriter:
+    # Thread-safe, so targets on different drives can be planned in parallel
+    def __init__(self, plan_path):
+        self.lock = Lock()
+        self.plan_file = open(plan_path, "w", encoding="utf-8")
+        self.target_count = 0
+
+    def begin_target(self, directory, rule):
+        with self.lock:
+            self.target_count += 1
+            target_id = self.target_count
+        return TargetPlan(self, target_id, directory, rule)
+
+    def write(self, entry):
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            self.plan_file.write(line)
+
+    def close(self):
+        self.plan_file.close()
+
+
+def read_plan(plan_path):
+    # Yields ("dir", target_id, (path, is_root, count)), ("file", target_id, FileRecord)
+    # and ("target", target_id, summary) in file order
+    with open(plan_path, "r", encoding="utf-8") as plan_file:
+        for line in plan_file:
+            entry = json.loads(line)
+            kind = entry["type"]
+            if kind == "file":
+                yield kind, entry["target"], FileRecord(entry["path"], entry["size"], entry["mtime"], entry.get("is_dir", False))
+            elif kind == "dir":
+                yield kind, entry["target"], (entry["path"], entry["root"], entry["count"])
+            else:
+                yield kind, entry["target"], entry
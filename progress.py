@@ -0,0 +1,89 @@
+import os
+import time
+from collections import namedtuple
+from threading import Lock
+
+
+class ProgressSnapshot(namedtuple("ProgressSnapshot", ["status", "files", "bytes", "folders", "path", "elapsed"])):
+    def text(self):
+        if not self.files and not self.folders:
+            return self.status
+        label = f"{self.status} {os.path.basename(self.path)}" if self.path else self.status
+        return f"{label} ({self.files} file(s), {self.bytes / (1024 ** 3):.2f} GB, {self.folders} folder(s))"
+
+
+class ProgressReporter:
+    # Aggregates per-file progress in the worker thread and publishes a ProgressSnapshot
+    # at most once per interval, so the UI sees ~10 updates/sec however fast files go.
+    # flush() publishes the latest state right away.
+
+    def __init__(self, publish, interval=0.1):
+        self.publish = publish
+        self.interval = interval
+        self.lock = Lock()
+        self.status = ""
+        self.path = None
+        self.files = 0
+        self.bytes = 0
+        self.folders = 0
+        self.start_time = time.monotonic()
+        self.last_publish = 0
+        self.changed = False
+
+    def reset(self, status=""):
+        with self.lock:
+            self.status = status
+            self.path = None
+            self.files = 0
+            self.bytes = 0
+            self.folders = 0
+            self.start_time = time.monotonic()
+            self.changed = True
+        self.flush()
+
+    def set_status(self, status, path=None):
+        with self.lock:
+            self.status = status
+            self.path = path
+            self.changed = True
+        self.publish_if_due()
+
+    def deleted(self, path, size):
+        with self.lock:
+            self.status = "Deleting"
+            self.path = path
+            self.files += 1
+            self.bytes += size
+            self.changed = True
+        self.publish_if_due()
+
+    def removed_folder(self, path):
+        with self.lock:
+            self.status = "Deleting Empty Directory"
+            self.path = path
+            self.folders += 1
+            self.changed = True
+        self.publish_if_due()
+
+    def totals(self):
+        with self.lock:
+            return self.files, self.bytes
+
+    def snapshot(self):
+        with self.lock:
+            return ProgressSnapshot(self.status, self.files, self.bytes, self.folders, self.path,
+                                    time.monotonic() - self.start_time)
+
+    def publish_if_due(self):
+        if time.monotonic() - self.last_publish >= self.interval:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.changed:
+                return
+            self.changed = False
+            self.last_publish = time.monotonic()
+            snapshot = ProgressSnapshot(self.status, self.files, self.bytes, self.folders, self.path,
+                                        self.last_publish - self.start_time)
+        self.publish(snapshot)
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import time
+from threading import Lock
+
+from scanner import FileRecord
+
+
+class ResumeStore:
+    # Per-target progress that survives a restart, so an interrupted cleanup continues where it stopped.
+    #   resume.json          - {key: state} for every unfinished target (walk stack or selection offset)
+    #   <key hash>.jsonl     - the remaining oldest-first selection of a size target, one record per line
+    # save() rewrites resume.json at most every save_interval seconds unless forced; losing the
+    # last few seconds only means a few folders are listed again.
+
+    def __init__(self, folder, save_interval=10):
+        self.folder = folder
+        self.state_path = os.path.join(folder, "resume.json")
+        self.save_interval = save_interval
+        self.lock = Lock()
+        self.last_save = 0
+        os.makedirs(folder, exist_ok=True)
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                self.states = json.load(state_file)
+        except (OSError, ValueError):
+            self.states = {}
+
+    def load(self, key):
+        with self.lock:
+            return self.states.get(key)
+
+    def due(self):
+        # True when a save() would write, so callers can skip building a state that would not be written
+        return time.monotonic() - self.last_save >= self.save_interval
+
+    def save(self, key, state, force=False):
+        with self.lock:
+            self.states[key] = dict(state, time=time.time())
+            if force or self.due():
+                self.write_states()
+
+    def clear(self, key):
+        with self.lock:
+            if self.states.pop(key, None) is None:
+                return
+            self.write_states()
+        try:
+            os.remove(self.selection_path(key))
+        except OSError:
+            pass
+
+    def write_states(self):
+        # Called with the lock held; atomic replace so a crash never leaves half a file
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as state_file:
+            json.dump(self.states, state_file)
+        os.replace(temp_path, self.state_path)
+        self.last_save = time.monotonic()
+
+    def selection_path(self, key):
+        return os.path.join(self.folder, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jsonl")
+
+    def write_selection(self, key, records):
+        with open(self.selection_path(key), "w", encoding="utf-8") as selection_file:
+            for record in records:
+                selection_file.write(json.dumps([record.path, record.size, record.mtime]) + "\n")
+        self.save(key, {"offset": 0}, force=True)
+
+    def read_selection(self, key, offset=0):
+        # Records from the offset-th line on; the file is gone once the target is cleared
+        try:
+            with open(self.selection_path(key), "r", encoding="utf-8") as selection_file:
+                for line_number, line in enumerate(selection_file):
+                    if line_number >= offset:
+                        path, size, mtime = json.loads(line)
+                        yield FileRecord(path, size, mtime, False)
+        except OSError:
+            return
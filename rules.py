@@ -0,0 +1,113 @@
+import os
+import re
+from functools import lru_cache
+
+# Per-target file filters from the optional target list columns:
+#   Include / Exclude    - patterns separated by ";". A glob matches the end of the path at a folder
+#                          boundary: "*.ini" is every .ini file, "Recipe/*.bmp" the .bmp files directly
+#                          in any Recipe folder, "**" crosses folders. "re:" starts a regex searched in
+#                          the whole path. Case-insensitive on Windows.
+#   Min/Max Size (MB)    - files outside the range are kept
+# All patterns of a column are compiled into one regex, so a file costs at most two regex searches.
+
+PATTERN_SEPARATOR = ";"
+REGEX_PREFIX = "re:"
+SEPARATORS = r"[\\/]"
+
+
+def split_patterns(text):
+    return tuple(pattern.strip() for pattern in (text or "").split(PATTERN_SEPARATOR) if pattern.strip())
+
+
+def glob_to_regex(pattern):
+    # Like fnmatch.translate, but * and ? stay within one folder and / matches either separator
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            if i < len(pattern) and pattern[i] in "\\/":
+                parts[-1] = f"(?:.*{SEPARATORS})?"
+                i += 1
+            continue
+        if char == "*":
+            parts.append(r"[^\\/]*")
+        elif char == "?":
+            parts.append(r"[^\\/]")
+        elif char in "\\/":
+            parts.append(SEPARATORS)
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return f"(?:^|{SEPARATORS})" + "".join(parts) + r"\Z"
+
+
+def compile_patterns(patterns):
+    # One regex for a whole column, or None when it is empty
+    if not patterns:
+        return None
+    sources = [pattern[len(REGEX_PREFIX):] if pattern.startswith(REGEX_PREFIX) else glob_to_regex(pattern)
+               for pattern in patterns]
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    try:
+        return re.compile("|".join(f"(?:{source})" for source in sources), flags)
+    except re.error as e:
+        raise ValueError(f"Invalid pattern in {PATTERN_SEPARATOR.join(patterns)!r}: {e}")
+
+
+class FileFilter:
+    def __init__(self, include=(), exclude=(), min_bytes=None, max_bytes=None):
+        self.include = compile_patterns(include)
+        self.exclude = compile_patterns(exclude)
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+
+        # Short description for rule names in the log, audit records and metrics
+        terms = []
+        if include:
+            terms.append("include=" + PATTERN_SEPARATOR.join(include))
+        if exclude:
+            terms.append("exclude=" + PATTERN_SEPARATOR.join(exclude))
+        if min_bytes is not None:
+            terms.append(f"size>={min_bytes / (1024 ** 2):g}MB")
+        if max_bytes is not None:
+            terms.append(f"size<={max_bytes / (1024 ** 2):g}MB")
+        self.name = " ".join(terms)
+
+    def matches(self, record):
+        if self.min_bytes is not None and record.size < self.min_bytes:
+            return False
+        if self.max_bytes is not None and record.size > self.max_bytes:
+            return False
+        if self.exclude is not None and self.exclude.search(record.path):
+            return False
+        return self.include is None or self.include.search(record.path) is not None
+
+    def select(self, records):
+        return filter(self.matches, records)
+
+
+@lru_cache(maxsize=256)
+def compile_filter(include="", exclude="", min_size_mb=None, max_size_mb=None):
+    # Compiled once per distinct rule; None when the target has no filter, so callers skip the check
+    include = split_patterns(include)
+    exclude = split_patterns(exclude)
+    if not include and not exclude and min_size_mb is None and max_size_mb is None:
+        return None
+    min_bytes = min_size_mb * (1024 ** 2) if min_size_mb is not None else None
+    max_bytes = max_size_mb * (1024 ** 2) if max_size_mb is not None else None
+    if min_bytes is not None and max_bytes is not None and min_bytes > max_bytes:
+        raise ValueError(f"Min Size {min_size_mb:g} MB is larger than Max Size {max_size_mb:g} MB")
+    return FileFilter(include, exclude, min_bytes, max_bytes)
@@ -0,0 +1,69 @@
+import os
+from collections import namedtuple
+
+# One record per directory entry, filled from the DirEntry stat cache so a file is stat'ed once per scan
+FileRecord = namedtuple("FileRecord", ["path", "size", "mtime", "is_dir"])
+
+# Called with the number of entries stat'ed per listed directory when metrics are enabled
+stat_counter = None
+
+
+def list_directory(directory, on_error=None):
+    # Single scandir pass over one directory, returns (dir_records, file_records)
+    dir_records = []
+    file_records = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                stat = entry.stat(follow_symlinks=False)
+            except OSError as e:
+                if on_error is not None:
+                    on_error(e)
+                continue
+            if is_dir:
+                dir_records.append(FileRecord(entry.path, 0, stat.st_mtime, True))
+            else:
+                file_records.append(FileRecord(entry.path, stat.st_size, stat.st_mtime, False))
+    if stat_counter is not None:
+        stat_counter(len(dir_records) + len(file_records))
+    return dir_records, file_records
+
+
+def walk_records(directory, on_error=None, stack=None):
+    # Top-down walk like os.walk, but yields (root, dir_records, file_records).
+    # The caller may prune dir_records in place to skip subtrees.
+    # stack, if given, is the list of folders still to visit and is consumed in place, so a caller
+    # can save it (plus the current root's subfolders) and resume the walk later.
+    if stack is None:
+        stack = [directory]
+    while stack:
+        root = stack.pop()
+        try:
+            dir_records, file_records = list_directory(root, on_error)
+        except OSError as e:
+            if on_error is not None:
+                on_error(e)
+            continue
+
+        yield root, dir_records, file_records
+
+        # Reversed so subdirectories are visited in listing order
+        for record in reversed(dir_records):
+            stack.append(record.path)
+
+
+def scan_directory(directory, include_dirs=False, on_error=None, on_listing=None):
+    # Flat stream of records for every file (and optionally directory) under directory.
+    # on_listing(root, dir_records, file_records) sees each folder's listing as it is read.
+    for root, dir_records, file_records in walk_records(directory, on_error):
+        if on_listing is not None:
+            on_listing(root, dir_records, file_records)
+        if include_dirs:
+            yield from dir_records
+        yield from file_records
+
+
+def directory_size(directory, on_error=None):
+    # Recursive size of a folder from one scandir pass, for accounting before a bulk rmtree
+    return sum(record.size for record in scan_directory(directory, on_error=on_error))
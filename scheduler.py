@@ -0,0 +1,74 @@
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def drive_key(hdd_path, directory):
+    # Targets are grouped by their HDD column, falling back to the directory's drive
+    drive = hdd_path or os.path.splitdrive(directory)[0] or directory
+    return os.path.normcase(drive.rstrip("\\/")) or drive
+
+
+def parse_drive_limits(text):
+    # "D:=2, E:=1" (";" separates too), from the CLI and the GUI's Drive Limits field
+    limits = {}
+    for item in text.replace(";", ",").split(","):
+        if not item.strip():
+            continue
+        drive, separator, limit = item.strip().rpartition("=")
+        if not separator or not drive.strip() or not limit.strip().isdigit() or int(limit) < 1:
+            raise ValueError(f"Expected DRIVE=N with N >= 1, got {item.strip()!r}")
+        limits[drive.strip()] = int(limit)
+    return limits
+
+
+class DriveScheduler:
+    # Runs each physical drive's targets concurrently with the other drives,
+    # never more than the drive's limit at once on the same disk
+
+    def __init__(self, drive_limits=None, default_limit=1):
+        self.drive_limits = {os.path.normcase(drive.rstrip("\\/")): limit
+                             for drive, limit in (drive_limits or {}).items()}
+        self.default_limit = max(1, default_limit)
+
+    def drive_limit(self, drive):
+        return max(1, self.drive_limits.get(drive, self.default_limit))
+
+    def group_by_drive(self, target_list):
+        groups = OrderedDict()
+        for target in target_list:
+            groups.setdefault(drive_key(target[0], target[1]), []).append(target)
+        return groups
+
+    def run(self, target_list, process_target, on_target_done=None):
+        # Returns [(target, seconds, error)] in completion order
+        queues = {drive: deque(targets) for drive, targets in self.group_by_drive(target_list).items()}
+        results = []
+
+        def drive_worker(drive):
+            pending = queues[drive]
+            while True:
+                try:
+                    target = pending.popleft()
+                except IndexError:
+                    return
+                start_time = time.time()
+                error = None
+                try:
+                    process_target(target)
+                except Exception as e:
+                    error = e
+                result = (target, time.time() - start_time, error)
+                results.append(result)
+                if on_target_done is not None:
+                    on_target_done(*result)
+
+        workers = [drive for drive, pending in queues.items()
+                   for _ in range(min(self.drive_limit(drive), len(pending)))]
+        if not workers:
+            return results
+        with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+            for future in [executor.submit(drive_worker, drive) for drive in workers]:
+                future.result()
+        return results
@@ -0,0 +1,11 @@
+def take_oldest(sorted_records, bytes_needed):
+    # The oldest records whose sizes add up to bytes_needed, for input that is already ordered oldest
+    # first (index lookups); stops reading as soon as the deficit is covered
+    selected = []
+    total_size = 0
+    for record in sorted_records:
+        if total_size >= bytes_needed:
+            break
+        selected.append(record)
+        total_size += record.size
+    return selected
@@ -0,0 +1,256 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from collections import namedtuple
+
+import psutil
+
+WatchEvent = namedtuple("WatchEvent", ["path", "is_dir", "kind"])
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingBackend:
+    # Fallback without filesystem events; TargetWatcher still polls free space every check_interval
+    name = "polling"
+
+    def add_tree(self, directory):
+        return 0
+
+    def read_events(self, timeout):
+        time.sleep(timeout)
+        return []
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    # Linux backend, one inotify watch per directory in the watched trees
+    name = "inotify"
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.inotify_add_watch = libc.inotify_add_watch
+        self.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.watches = {}
+        self.watch_limit_reached = False
+
+    def add_watch(self, directory):
+        if self.watch_limit_reached:
+            return False
+        wd = self.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            if errno == 28:  # ENOSPC: fs.inotify.max_user_watches exhausted
+                self.watch_limit_reached = True
+            return False
+        self.watches[wd] = directory
+        return True
+
+    def add_tree(self, directory):
+        added = 0
+        for root, dirs, _ in os.walk(directory):
+            if self.add_watch(root):
+                added += 1
+            elif self.watch_limit_reached:
+                break
+        return added
+
+    def read_events(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append(WatchEvent(None, False, "overflow"))
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+            is_dir = bool(mask & IN_ISDIR)
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) or (mask & IN_CREATE and is_dir):
+                if is_dir:
+                    self.add_tree(path)  # New folders need their own watches
+                events.append(WatchEvent(path, is_dir, "write"))
+            elif mask & (IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF):
+                events.append(WatchEvent(path, is_dir, "delete"))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watch_backend():
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyBackend()
+        except (OSError, AttributeError):
+            pass
+    return PollingBackend()
+
+
+class TargetAccount:
+    # Running free-space estimate for one size target between real disk_usage checks
+    def __init__(self, target):
+        self.target = target
+        self.hdd_path = target[0]
+        self.directory = os.path.normpath(target[1])
+        self.target_bytes = target[2] * (1024 ** 3)
+        self.last_free = 0
+        self.last_check = 0
+        self.bytes_written = 0
+        self.files_written = 0
+        self.newest_mtime = 0
+        self.last_trigger = 0
+        self.free_at_trigger = 0
+        self.files_at_trigger = 0
+        self.retrigger_delay = 0  # Set by TargetWatcher.should_retrigger
+
+    def estimated_free(self):
+        return self.last_free - self.bytes_written
+
+
+class TargetWatcher:
+    def __init__(self, target_list, backend=None, check_interval=10, retrigger_interval=60, max_retrigger_interval=3600):
+        self.backend = backend if backend is not None else create_watch_backend()
+        self.check_interval = check_interval
+        self.retrigger_interval = retrigger_interval
+        self.max_retrigger_interval = max(retrigger_interval, max_retrigger_interval)
+        self.accounts = [TargetAccount(target) for target in target_list
+                         if target[0] is not None and target[2] is not None]
+
+    def set_targets(self, target_list):
+        # Reloaded target list: unchanged size targets keep their running estimate, new ones are watched.
+        # Watches of removed targets stay until restart; their events match no account.
+        accounts = {account.target: account for account in self.accounts}
+        watched_directories = {account.directory for account in self.accounts}
+        self.accounts = []
+        for target in target_list:
+            if target[0] is None or target[2] is None:
+                continue
+            account = accounts.get(target)
+            if account is None:
+                account = TargetAccount(target)
+                if account.directory not in watched_directories and os.path.isdir(account.directory):
+                    self.backend.add_tree(account.directory)
+                self.check_free_space(account)
+            self.accounts.append(account)
+
+    def start(self):
+        watched = 0
+        for account in self.accounts:
+            if os.path.isdir(account.directory):
+                watched += self.backend.add_tree(account.directory)
+            self.check_free_space(account)
+        return watched
+
+    def reconcile(self):
+        # Called after each full scan; resets the estimates from the real free space
+        now = time.time()
+        for account in self.accounts:
+            self.check_free_space(account, now)
+
+    def check_free_space(self, account, now=None):
+        account.last_free = psutil.disk_usage(account.hdd_path).free
+        account.last_check = now if now is not None else time.time()
+        account.bytes_written = 0
+
+    def account_for(self, path):
+        path = os.path.normpath(path)
+        for account in self.accounts:
+            if path == account.directory or path.startswith(account.directory + os.sep):
+                return account
+        return None
+
+    def wait(self, timeout):
+        # Process events for up to timeout seconds, return size targets whose drive dropped below target
+        for event in self.backend.read_events(timeout):
+            if event.kind == "overflow":
+                for account in self.accounts:
+                    account.last_check = 0  # Lost events, force a real check
+                continue
+            if event.kind != "write" or event.is_dir:
+                continue
+            account = self.account_for(event.path)
+            if account is None:
+                continue
+            try:
+                stat = os.lstat(event.path)
+            except OSError:
+                continue
+            account.bytes_written += stat.st_size
+            account.files_written += 1
+            account.newest_mtime = max(account.newest_mtime, stat.st_mtime)
+
+        now = time.time()
+        triggered = []
+        for account in self.accounts:
+            if account.estimated_free() < account.target_bytes or now - account.last_check >= self.check_interval:
+                self.check_free_space(account, now)
+            if account.last_free < account.target_bytes and self.should_retrigger(account, now):
+                account.last_trigger = now
+                account.free_at_trigger = account.last_free
+                account.files_at_trigger = account.files_written
+                triggered.append(account.target)
+        return triggered
+
+    def should_retrigger(self, account, now):
+        # A target still below its size after a cleanup is only scanned again once new files arrived
+        # (seen as events, or as less free space for backends without events), and the wait doubles up
+        # to max_retrigger_interval while cleanups free nothing, so an unreachable target does not cost
+        # a full scan every retrigger_interval
+        if not account.last_trigger:
+            account.retrigger_delay = self.retrigger_interval
+            return True
+        if account.files_written == account.files_at_trigger and account.last_free >= account.free_at_trigger:
+            return False
+        if now - account.last_trigger < account.retrigger_delay:
+            return False
+        if account.last_free > account.free_at_trigger:
+            account.retrigger_delay = self.retrigger_interval
+        else:
+            account.retrigger_delay = min(max(account.retrigger_delay * 2, self.retrigger_interval),
+                                          self.max_retrigger_interval)
+        return True
+
+    def close(self):
+        self.backend.close()